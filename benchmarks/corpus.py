@@ -0,0 +1,222 @@
+"""Deterministic synthetic corpora for the benchmarks.
+
+The same seed and scale always produce byte-identical files, so the
+numbers of different runs (and machines) are comparable. Each kind
+stresses a different part of the inspection;
+
+- small: lots of tiny modules (per file overhead, scheduling)
+- huge: a few very long modules (traversal, chunk balancing)
+- nested: deeply nested blocks and expressions (recursion, context)
+- exceptions: try/except heavy code (the exception tree plugins)
+"""
+
+import argparse
+import random
+import sys
+import sysconfig
+from pathlib import Path
+
+KINDS = ("small", "huge", "nested", "exceptions")
+# number of files, and number of top level definitions in each of them
+SHAPES = {
+    "small": (200, 2),
+    "huge": (2, 600),
+    "nested": (20, 10),
+    "exceptions": (40, 25),
+}
+EXCEPTIONS = (
+    "ValueError",
+    "KeyError",
+    "IndexError",
+    "TypeError",
+    "OSError",
+    "FileNotFoundError",
+    "LookupError",
+    "Exception",
+)
+
+
+class _Writer:
+    def __init__(self, rng):
+        self.rng = rng
+        self.lines = []
+        self.level = 0
+        self.counter = 0
+
+    def name(self, prefix="var"):
+        self.counter += 1
+        return f"{prefix}_{self.counter}"
+
+    def line(self, text):
+        self.lines.append("    " * self.level + text)
+
+    def block(self, header, body):
+        self.line(header + ":")
+        self.level += 1
+        body()
+        self.level -= 1
+
+    def expression(self, depth=0):
+        choice = self.rng.randrange(6 if depth < 3 else 2)
+        if choice == 0:
+            return str(self.rng.randrange(100))
+        elif choice == 1:
+            return repr(self.name("text"))
+        elif choice == 2:
+            left = self.expression(depth + 1)
+            right = self.expression(depth + 1)
+            return f"({left} {self.rng.choice('+-*%')} {right})"
+        elif choice == 3:
+            items = ", ".join(
+                self.expression(depth + 1)
+                for _ in range(self.rng.randrange(1, 4))
+            )
+            return f"[{items}]"
+        elif choice == 4:
+            return f"len({self.expression(depth + 1)})"
+        else:
+            item = self.name("item")
+            return (
+                f"[{item} for {item} in range({self.rng.randrange(10)}) "
+                f"if {item} != {self.rng.randrange(10)}]"
+            )
+
+    def assignment(self):
+        self.line(f"{self.name()} = {self.expression()}")
+
+    def statements(self, count):
+        for _ in range(count):
+            choice = self.rng.randrange(5)
+            if choice == 0:
+                self.assignment()
+            elif choice == 1:
+                self.line(f"print({self.expression()})")
+            elif choice == 2:
+                self.block(f"if {self.expression()}", self.assignment)
+            elif choice == 3:
+                self.block(
+                    f"for {self.name('item')} in {self.expression()}",
+                    lambda: self.line("continue"),
+                )
+            else:
+                self.line(f"return {self.expression()}")
+                break
+
+    def function(self, body):
+        args = ", ".join(
+            self.name("arg") for _ in range(self.rng.randrange(4))
+        )
+        self.block(f"def {self.name('function')}({args})", body)
+        self.line("")
+
+    def klass(self, methods):
+        def body():
+            self.line(f'"""{self.name("doc")}."""')
+            for _ in range(methods):
+                self.function(lambda: self.statements(4))
+
+        self.block(f"class {self.name('Class')}", body)
+        self.line("")
+
+    def nested(self, depth):
+        if depth == 0:
+            self.statements(2)
+            return
+
+        header = self.rng.choice(
+            (
+                f"if {self.expression()}",
+                f"while {self.expression()}",
+                f"for {self.name('item')} in {self.expression()}",
+                f"with open({self.expression()}) as {self.name('file')}",
+                f"def {self.name('inner')}()",
+            )
+        )
+        self.block(header, lambda: self.nested(depth - 1))
+
+    def handler(self, depth=0):
+        def body():
+            self.statements(2)
+            if depth < 2 and self.rng.random() < 0.4:
+                self.handler(depth + 1)
+
+        self.block("try", body)
+        for _ in range(self.rng.randrange(1, 4)):
+            kinds = self.rng.sample(EXCEPTIONS, self.rng.randrange(1, 3))
+            target = self.rng.choice(("", f" as {self.name('exc')}"))
+            if len(kinds) > 1:
+                header = f"except ({', '.join(kinds)}){target}"
+            else:
+                header = f"except {kinds[0]}{target}"
+            self.block(header, lambda: self.statements(1))
+        if self.rng.random() < 0.3:
+            self.block("finally", lambda: self.line("pass"))
+
+    def render(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def generate_source(kind, definitions, rng):
+    writer = _Writer(rng)
+    writer.line(f'"""Synthetic {kind} module."""')
+    writer.line("import os")
+    writer.line("")
+    for _ in range(definitions):
+        if kind == "nested":
+            writer.function(lambda: writer.nested(rng.randrange(8, 20)))
+        elif kind == "exceptions":
+            writer.function(writer.handler)
+        elif rng.random() < 0.2:
+            writer.klass(rng.randrange(1, 5))
+        else:
+            writer.function(lambda: writer.statements(rng.randrange(2, 8)))
+    return writer.render()
+
+
+def generate(directory, kinds=KINDS, seed=0, scale=1.0):
+    """Write the synthetic corpus into `directory` and return the
+    generated files (sorted)."""
+
+    directory = Path(directory)
+    files = []
+    for kind in kinds:
+        count, definitions = SHAPES[kind]
+        rng = random.Random(f"{seed}-{kind}")
+        (directory / kind).mkdir(parents=True, exist_ok=True)
+        for index in range(max(1, round(count * scale))):
+            file = directory / kind / f"module_{index:04}.py"
+            file.write_text(generate_source(kind, definitions, rng))
+            files.append(file)
+    return sorted(files)
+
+
+def stdlib_files(limit=None):
+    """Python files of the running interpreter's standard library (without
+    the tests and the third party packages), sorted."""
+
+    root = Path(sysconfig.get_paths()["stdlib"])
+    skipped = {"test", "tests", "site-packages", "dist-packages", "idlelib"}
+    files = sorted(
+        file
+        for file in root.rglob("*.py")
+        if not skipped.intersection(file.relative_to(root).parts)
+    )
+    return files[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--kind", choices=KINDS, action="append")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0)
+    options = parser.parse_args(argv)
+
+    files = generate(
+        options.directory, options.kind or KINDS, options.seed, options.scale
+    )
+    print(f"Generated {len(files)} files under {options.directory}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
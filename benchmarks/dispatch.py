@@ -0,0 +1,151 @@
+"""Per-node overhead of `Inspector`'s hook dispatching.
+
+Compares the precompiled dispatch table with the previous
+`__getattr__` (`visit_X` resolving) based dispatching, both with a no-op
+hook on every node type of the sources (pure traversal and dispatch
+overhead, nothing can be pruned) and with the core plugins.
+
+The legacy rows are not the baseline inspector as is; they run one
+`Inspector.prepare` pass before the old visitor, since today's plugins
+(the node preparers, `table` and `parentize`) need the flattened tree
+it builds. So they measure the old dispatching on top of that pass.
+
+`it` has to be importable (`pip install -e .` in the checkout);
+
+    python benchmarks/dispatch.py --repeat 5
+"""
+
+import argparse
+import ast
+import sys
+import timeit
+from functools import lru_cache, partial
+from pathlib import Path
+
+from it.inspector import Inspector
+from it.plugin import Plugin
+from it.session import Session
+from it.utils import Events, _version_node
+
+DEFAULT_SOURCES = (ast.__file__, argparse.__file__, timeit.__file__)
+PLUGIN = Plugin.from_simple("@benchmark")
+
+
+class LegacyInspector(Inspector):
+    def visit(self, tree):
+        # node preparers run, and the flattened tree is shared with the
+        # plugins, the same way as in `Inspector.visit` (the plugins don't
+        # work without it, see the module docstring)
+        self._hook_db["inspector"]["flattened"] = self.prepare(tree)
+        self.visited = 0
+        # the rest of the nodes go through `ast.NodeVisitor`
+        self.visit = partial(ast.NodeVisitor.visit, self)
+        self.visit(tree)
+
+    def visitor(self, hooks, node):
+        self.visited += 1
+        for hook in hooks:
+            if hook(node, self._hook_db):
+                self.report(hook, node)
+
+        self.generic_visit(node)
+        for node_finalizer in self._event_hooks[Events.NODE_FINALIZE]:
+            if isinstance(node, tuple(node_finalizer.handles)):
+                node_finalizer(node, self._hook_db)
+
+    def visit_Constant(self, node):
+        # defined by `ast.NodeVisitor` (for the deprecated constant node
+        # types), so `__getattr__` never sees it
+        self.visitor(self._hooks[ast.Constant], node)
+
+    @lru_cache(128)
+    def __getattr__(self, attr):
+        _attr = attr[len("visit_") :]
+        if hasattr(ast, _attr) and _version_node(_attr):
+            return partial(self.visitor, self._hooks[getattr(ast, _attr)])
+        raise AttributeError(attr)
+
+
+def visited(inspector):
+    if isinstance(inspector, LegacyInspector):
+        return inspector.visited
+    return inspector.stats["visited"]
+
+
+def measure(inspector_type, trees, repeat, number):
+    """Return the time of inspecting all trees, and the number of nodes
+    whose hooks were dispatched."""
+
+    def run():
+        for tree in trees:
+            inspector_type(tree).handle()
+
+    elapsed = min(timeit.repeat(run, repeat=repeat, number=number)) / number
+    inspectors = [inspector_type(tree) for tree in trees]
+    for inspector in inspectors:
+        inspector.handle()
+    return elapsed, sum(map(visited, inspectors))
+
+
+def noop(node, db):
+    return False
+
+
+def register_noop_hooks(trees):
+    """Replace all registered hooks with a no-op hook on every node type
+    that appears in the trees."""
+
+    Inspector._hooks.clear()
+    Inspector._event_hooks.clear()
+    hook = Inspector.register(
+        *{type(node) for tree in trees for node in ast.walk(tree)}
+    )(noop)
+    hook.plugin = PLUGIN
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sources", type=Path, nargs="*")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=3)
+    options = parser.parse_args(argv)
+
+    sources = options.sources or map(Path, DEFAULT_SOURCES)
+    trees = [ast.parse(source.read_text()) for source in sources]
+    nodes = sum(1 for tree in trees for _ in ast.walk(tree))
+    print(f"{len(trees)} files, {nodes} nodes")
+
+    registries = ({**Inspector._hooks}, {**Inspector._event_hooks})
+    for hook_set in ("no-op", "core"):
+        if hook_set == "no-op":
+            register_noop_hooks(trees)
+        else:
+            for registry, backup in zip(
+                (Inspector._hooks, Inspector._event_hooks), registries
+            ):
+                registry.clear()
+                registry.update(backup)
+            session = Session()
+            session.start()
+            session.load_deferred_plugins()
+
+        for inspector_type in (LegacyInspector, Inspector):
+            elapsed, visited_nodes = measure(
+                inspector_type, trees, options.repeat, options.number
+            )
+            print(
+                f"{hook_set:<6} {inspector_type.__name__:<16} "
+                f"{elapsed * 1e9 / nodes:8.1f} ns/node "
+                f"({visited_nodes} visited)"
+            )
+            if hook_set == "no-op" and visited_nodes != nodes:
+                # with a hook on every node type, nothing can be pruned
+                raise RuntimeError(
+                    f"{inspector_type.__name__} visited {visited_nodes} "
+                    f"of {nodes} nodes"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
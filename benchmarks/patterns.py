@@ -0,0 +1,133 @@
+"""Per-node cost of `ast.Call` hooks as the number of hooks grows.
+
+Only the hooks are timed (called on every call node of the sources, the
+same way the inspector does), not the traversal.
+
+Every hook looks for calls to a different name with a single generator
+expression argument (`name_N(x for x in y)`), written both by hand (a
+conjunction of checks in each hook) and as a pattern (see `it.pattern`,
+where the shared checks are made once for all hooks). With the package
+installed (`pip install -e .`);
+
+    python benchmarks/patterns.py --hooks 1 4 16 64
+"""
+
+import argparse
+import ast
+import sys
+import timeit
+from pathlib import Path
+
+import it.pattern
+from it.inspector import Inspector
+from it.pattern import items, length, name, pattern
+from it.plugin import Plugin
+from it.utils import name_check
+
+DEFAULT_SOURCES = (ast.__file__, argparse.__file__, timeit.__file__)
+PLUGIN = Plugin.from_simple("@benchmark")
+
+
+def handwritten_hook(function):
+    def hook(node, db):
+        return (
+            name_check(node.func, function)
+            and len(node.args) == 1
+            and len(node.keywords) == 0
+            and isinstance(node.args[0], ast.GeneratorExp)
+        )
+
+    return Inspector.register(ast.Call)(hook)
+
+
+def pattern_hook(function):
+    def hook(node, db):
+        return True
+
+    return Inspector.register(
+        pattern(
+            ast.Call,
+            func=name(function),
+            args=items(ast.GeneratorExp),
+            keywords=length(0),
+        )
+    )(hook)
+
+
+def register_hooks(factory, count):
+    """Replace all registered hooks with `count` hooks of the factory."""
+
+    Inspector._hooks.clear()
+    Inspector._event_hooks.clear()
+    it.pattern._PATTERN_SETS.clear()
+    for index in range(count):
+        hook = factory(f"name_{index}")
+        hook.__name__ = f"hook_{index}"
+        hook.plugin = PLUGIN
+
+
+def measure(calls, repeat, number):
+    hooks = tuple(Inspector._hooks[ast.Call])
+    db = {}
+
+    def run():
+        for node in calls:
+            for hook in hooks:
+                hook(node, db)
+
+    return min(timeit.repeat(run, repeat=repeat, number=number)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("sources", type=Path, nargs="*")
+    parser.add_argument("--hooks", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=10)
+    options = parser.parse_args(argv)
+
+    sources = options.sources or map(Path, DEFAULT_SOURCES)
+    trees = [ast.parse(source.read_text()) for source in sources]
+    calls = [
+        node
+        for tree in trees
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Call)
+    ]
+    print(f"{len(trees)} files, {len(calls)} call nodes")
+    print(f"{'hooks':>5} {'handwritten':>17} {'patterns':>17}")
+
+    registries = (
+        {**Inspector._hooks},
+        {**Inspector._event_hooks},
+        {**it.pattern._PATTERN_SETS},
+    )
+    try:
+        for count in options.hooks:
+            costs = []
+            for factory in (handwritten_hook, pattern_hook):
+                register_hooks(factory, count)
+                elapsed = measure(calls, options.repeat, options.number)
+                costs.append(elapsed * 1e9 / len(calls))
+            print(
+                f"{count:>5} {costs[0]:>9.1f} ns/node "
+                f"{costs[1]:>9.1f} ns/node"
+            )
+    finally:
+        for registry, backup in zip(
+            (
+                Inspector._hooks,
+                Inspector._event_hooks,
+                it.pattern._PATTERN_SETS,
+            ),
+            registries,
+        ):
+            registry.clear()
+            registry.update(backup)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""Inspection throughput of the serial and the pooled modes.
+
+Every mode runs in a fresh interpreter, so the peak RSS (and the plugin
+loading) of one doesn't leak into the other. Results can be saved as a
+baseline, and later runs compared against it (the package has to be
+installed, e.g. with `pip install -e .`);
+
+    python benchmarks/throughput.py --save baseline.json
+    python benchmarks/throughput.py --baseline baseline.json
+
+The comparison fails (exits with 1) if any mode got slower (or used more
+memory) than the baseline by more than the threshold. Timings are the
+median of the rounds, and a slowdown also has to be larger than the
+spread between the rounds (of either run) to count, so the noise of
+back to back runs doesn't show up as a regression.
+"""
+
+import argparse
+import ast
+import json
+import logging
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import corpus
+
+MODES = ("serial", "pooled")
+# metric => whether higher is better
+METRICS = {
+    "files_per_sec": True,
+    "nodes_per_sec": True,
+    "peak_rss_mb": False,
+}
+# timed metrics, a change in these has to exceed the rounds' spread
+TIMED = {"files_per_sec", "nodes_per_sec"}
+DEFAULT_THRESHOLD = 0.2
+# results are only comparable if these are the same
+CORPUS_FIELDS = ("corpus", "seed", "scale", "limit")
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    if sys.platform == "darwin":
+        peak /= 1024
+    return peak / 1024
+
+
+def count_nodes(files):
+    nodes = 0
+    for file in files:
+        try:
+            tree = ast.parse(file.read_bytes())
+        except SyntaxError:
+            continue
+        nodes += sum(1 for _ in ast.walk(tree))
+    return nodes
+
+
+def plugin_costs(session, files):
+    """Seconds spent on the hooks of each plugin, from a profiled serial
+    run."""
+
+    from it.profile import SECONDS, Profile
+
+    session.profile = Profile()
+    for file in files:
+        session.batch_inspection(file, profile=session.profile)
+
+    costs = defaultdict(float)
+    for (plugin, _), stats in session.profile.hooks.items():
+        costs[plugin] += stats[SECONDS]
+    session.profile = None
+    return dict(sorted(costs.items(), key=lambda item: -item[1]))
+
+
+def run_mode(mode, files, workers, repeat):
+    from it.config import Config
+    from it.session import Session
+    from it.utils import logger
+
+    logger.setLevel(logging.WARNING)
+    session = Session(
+        Config(serial=mode == "serial", workers=workers, cache=False)
+    )
+    session.start()
+
+    # the first pooled round also pays for starting the workers, so it
+    # isn't counted if there are more
+    timings = []
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in session.iter_inspections(files):
+                pass
+            timings.append(time.perf_counter() - started)
+        costs = plugin_costs(session, files) if mode == "serial" else None
+    finally:
+        session.shutdown()
+
+    if mode == "pooled" and len(timings) > 2:
+        timings = timings[1:]
+    nodes = count_nodes(files)
+    elapsed = statistics.median(timings)
+    return {
+        "files": len(files),
+        "nodes": nodes,
+        "seconds": elapsed,
+        # relative difference of the slowest and the fastest rounds
+        "spread": (max(timings) - min(timings)) / elapsed,
+        "files_per_sec": len(files) / elapsed,
+        "nodes_per_sec": nodes / elapsed,
+        "peak_rss_mb": max(
+            peak_rss_mb(), peak_rss_mb(resource.RUSAGE_CHILDREN)
+        ),
+        "plugin_seconds": costs,
+    }
+
+
+def measure(mode, files, workers, repeat):
+    """Run the mode in a separate interpreter."""
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as file_list:
+        file_list.write("\n".join(map(str, files)))
+        file_list.flush()
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--run-mode",
+                mode,
+                "--file-list",
+                file_list.name,
+                "--workers",
+                str(workers),
+                "--repeat",
+                str(repeat),
+            ],
+            check=True,
+            stdout=subprocess.PIPE,
+        ).stdout
+    return json.loads(output)
+
+
+def compare(results, baseline, threshold):
+    """Return the regressions (as messages) of results against the
+    baseline."""
+
+    regressions = []
+    for mode, result in results["modes"].items():
+        previous = baseline["modes"].get(mode)
+        if previous is None:
+            continue
+        # baselines saved before the spread was recorded count as exact
+        spread = max(previous.get("spread", 0.0), result["spread"])
+        for metric, higher_is_better in METRICS.items():
+            old, new = previous[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            if higher_is_better:
+                change = -change
+            limit = max(threshold, spread) if metric in TIMED else threshold
+            if change > limit:
+                regressions.append(
+                    f"{mode} {metric}: {old:.2f} -> {new:.2f} "
+                    f"({change:.1%} worse)"
+                )
+    return regressions
+
+
+def report(results):
+    print(
+        f"{'mode':<8} {'files':>6} {'seconds':>8} {'spread':>7} "
+        f"{'files/s':>9} "
+        f"{'nodes/s':>10} {'peak rss':>9}"
+    )
+    for mode, result in results["modes"].items():
+        print(
+            f"{mode:<8} {result['files']:>6} {result['seconds']:>8.2f} "
+            f"{result['spread']:>7.1%} "
+            f"{result['files_per_sec']:>9.1f} "
+            f"{result['nodes_per_sec']:>10.0f} "
+            f"{result['peak_rss_mb']:>7.1f}MB"
+        )
+
+    for mode, result in results["modes"].items():
+        if not result["plugin_seconds"]:
+            continue
+        total = sum(result["plugin_seconds"].values())
+        print(f"\nPer plugin cost ({mode}, hooks only)")
+        for plugin, seconds in result["plugin_seconds"].items():
+            print(
+                f"{plugin:<16} {seconds * 1e3:>9.2f}ms "
+                f"{seconds / total:>7.1%}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "--corpus",
+        choices=("synthetic", "stdlib"),
+        default="synthetic",
+        help="inspected corpus (stdlib uses the running interpreter's)",
+    )
+    parser.add_argument("--corpus-dir", type=Path)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--limit", type=int, help="max number of files")
+    parser.add_argument("--mode", choices=MODES, action="append")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", type=Path, help="save results as json")
+    parser.add_argument("--baseline", type=Path, help="compare with results")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--run-mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--file-list", type=Path, help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+
+    if options.run_mode is not None:
+        files = list(map(Path, options.file_list.read_text().splitlines()))
+        result = run_mode(
+            options.run_mode, files, options.workers, options.repeat
+        )
+        json.dump(result, sys.stdout)
+        return 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        if options.corpus == "stdlib":
+            files = corpus.stdlib_files(options.limit)
+        else:
+            files = corpus.generate(
+                options.corpus_dir or directory,
+                seed=options.seed,
+                scale=options.scale,
+            )[: options.limit]
+
+        results = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": options.corpus,
+            "seed": options.seed,
+            "scale": options.scale,
+            "limit": options.limit,
+            "workers": options.workers,
+            "modes": {
+                mode: measure(mode, files, options.workers, options.repeat)
+                for mode in options.mode or MODES
+            },
+        }
+
+    report(results)
+    if options.save is not None:
+        options.save.write_text(json.dumps(results, indent=4) + "\n")
+
+    if options.baseline is not None:
+        baseline = json.loads(options.baseline.read_text())
+        for name in CORPUS_FIELDS:
+            if baseline.get(name) != results[name]:
+                print(
+                    f"\nCan't compare with the baseline, {name} differs "
+                    f"({baseline.get(name)!r} != {results[name]!r})"
+                )
+                return 2
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print(f"\nRegressions above {options.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions above {options.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+"""Regenerate the static plugin manifest (`it/plugins/manifest.json`)."""
+
+import argparse
+import json
+from pathlib import Path
+
+from it.manifest import MANIFEST, build_manifest, discover_plugins
+
+
+def generate():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output", type=Path, nargs="?", default=MANIFEST)
+    args = parser.parse_args()
+
+    manifest = build_manifest(discover_plugins())
+    with open(args.output, "w") as out:
+        json.dump(manifest, out, indent=4, sort_keys=True)
+        out.write("\n")
+    print(f"Wrote {len(manifest['plugins'])} plugins to {args.output}")
+
+
+if __name__ == "__main__":
+    generate()
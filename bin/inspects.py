@@ -163,6 +163,7 @@ def runner(origin, show_errors=False):
     session.config.update(load_core=True, plugins={})
 
     session.start()
+    session.load_deferred_plugins()
     available_handlers = chain.from_iterable(Inspector._hooks.values())
     available_handlers = {
         handler.__name__: handler for handler in available_handlers
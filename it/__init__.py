@@ -1 +1,11 @@
-from it.inspector import Inspector
+__all__ = ["Inspector"]
+
+
+def __getattr__(name):
+    # imported on the first use, so that importing a submodule (e.g
+    # `it.config` or `it.utils`) doesn't import the inspector as well
+    if name == "Inspector":
+        from it.inspector import Inspector
+
+        return Inspector
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,12 +1,14 @@
 import argparse
+import json
 import sys
-from distutils.util import strtobool
+from itertools import chain, islice
 from pathlib import Path
 
+from it.config import Blacklist
 from it.plugin import Plugin
-from it.reports import _prepare_result
+from it.reports import ReportBatch, Reporter, _prepare_result
 from it.session import Session
-from it.utils import logger, prepare_logger, traverse_paths
+from it.utils import logger, prepare_logger, strtobool, traverse_paths
 
 
 def prepare_parser(session):
@@ -64,6 +66,126 @@ def prepare_parser(session):
         default=False,
         help="dont use process pool executor",
     )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        default=session.config.cache,
+        help="dont use the on-disk result cache",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=session.config.cache_dir,
+        help="directory of the on-disk result cache",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        default=False,
+        help="keep plugins and workers warm behind a unix socket",
+    )
+    parser.add_argument(
+        "--client",
+        action="store_true",
+        default=False,
+        help="forward paths to a running daemon (if there is one)",
+    )
+    parser.add_argument(
+        "--daemon-socket",
+        type=Path,
+        default=session.config.daemon_socket,
+        help="unix socket address of the daemon",
+    )
+    parser.add_argument(
+        "--daemon-timeout",
+        type=float,
+        default=session.config.daemon_timeout,
+        help="seconds of idleness before the daemon shuts itself down",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        default=False,
+        help="re-inspect changed files until interrupted",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=session.config.watch_interval,
+        help="seconds between the polls of the watched files",
+    )
+    parser.add_argument(
+        "--no-inotify",
+        dest="inotify",
+        action="store_false",
+        default=session.config.inotify,
+        help="only poll the watched files (even if inotify is available)",
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        default=False,
+        help="print results in the order of files (instead of completion)",
+    )
+    parser.add_argument(
+        "--exclude",
+        metavar="GLOB",
+        action="append",
+        default=[],
+        help="skip files and directories matching GLOB (can be repeated)",
+    )
+    parser.add_argument(
+        "--no-gitignore",
+        dest="gitignore",
+        action="store_false",
+        default=session.config.gitignore,
+        help="dont skip files ignored by .gitignore",
+    )
+    parser.add_argument(
+        "--changed-since",
+        metavar="REV",
+        help="only inspect python files added or modified since REV (git)",
+    )
+    parser.add_argument(
+        "--include-untracked",
+        action="store_true",
+        default=False,
+        help="also inspect untracked files (with --changed-since)",
+    )
+    parser.add_argument(
+        "--changed-lines-only",
+        action="store_true",
+        default=False,
+        help="only report findings on changed lines (with --changed-since)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=sorted(Reporter.formats),
+        default="text",
+        help="output format of the reports",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="write the reports to this file instead of stdout",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile the hooks and print their stats",
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=["table", "json"],
+        default="table",
+        help="format of the profile",
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=Path,
+        help="write the profile to this file instead of the logs (stderr)",
+    )
     parser.add_argument(
         "--show-plugins",
         action="store_true",
@@ -77,35 +199,208 @@ def main():
     files = []
     session = Session()
     configuration = prepare_parser(session).parse_args()
+    reporter = None
+    if configuration.format != "text" or configuration.output is not None:
+        reporter = prepare_reporter(configuration.format, configuration.output)
+
     prepare_logger(
-        configuration.logging_level, configuration.logging_handler_level
+        configuration.logging_level,
+        configuration.logging_handler_level,
+        # keep the machine readable output clean
+        stream=sys.stderr if reporter is not None else None,
     )
 
     session.config.update(**vars(configuration))
+    session.config.blacklist = Blacklist(
+        configuration.ignore_plugin, configuration.ignore_code
+    )
+    if session.config.profile:
+        # cached results wouldn't show up in the profile
+        session.config.cache = False
+
+    line_ranges = None
+    if configuration.changed_since is not None:
+        from it import vcs
+
+        try:
+            files = vcs.changed_files(
+                configuration.changed_since, configuration.include_untracked
+            )
+            if configuration.changed_lines_only:
+                line_ranges = vcs.changed_lines(
+                    configuration.changed_since, files
+                )
+        except vcs.GitError as exc:
+            logger.error(f"Couldn't collect the changed files: {exc}")
+            exit(1)
+
+        files = filter_paths(files, configuration.paths)
+        if not files:
+            return logger.info("Nothing to do!")
+        configuration.paths = files
+
+    if configuration.client and configuration.paths:
+        from it import daemon
+
+        try:
+            reports = daemon.request(
+                session.config.daemon_socket,
+                configuration.paths,
+                session.config,
+            )
+        except daemon.DaemonError as exc:
+            logger.debug(
+                f"Couldn't use the daemon ({exc}), inspecting locally."
+            )
+        else:
+            return show_reports(
+                session, restrict_lines([reports], line_ranges), reporter
+            )
+
     session.start()
 
+    if configuration.daemon:
+        from it import daemon
+
+        try:
+            return daemon.serve(session)
+        except daemon.DaemonError as exc:
+            logger.error(f"Couldn't start the daemon: {exc}")
+            exit(1)
+
     if configuration.show_plugins:
         logger.info(
             f"Active plugins: {', '.join(plugin.static_name for plugin in session.plugins if not plugin.inactive)}"
         )
 
+    if configuration.watch and configuration.paths:
+        from it import watch
+
+        return watch.watch(session, configuration.paths)
+
     if configuration.paths:
-        files = traverse_paths(configuration.paths)
-        reports = session.bulk_inspection(*files)
-        if reports:
-            logger.info(
-                "InspectorTiger inspected \N{right-pointing magnifying glass} "
-                "and found these problems;"
+        files = traverse_paths(
+            configuration.paths,
+            session.config.exclude,
+            session.config.gitignore,
+        )
+        # a single file isn't worth starting the workers for
+        first_files = list(islice(files, 2))
+        if len(first_files) < 2:
+            session.config.serial = True
+        files = chain(first_files, files)
+        inspections = session.iter_inspections(files, configuration.ordered)
+        batches = (batch for _, batch in inspections)
+        show_reports(session, restrict_lines(batches, line_ranges), reporter)
+    else:
+        logger.info("Nothing to do!")
+
+
+def filter_paths(files, paths):
+    if not paths:
+        return files
+
+    paths = [path.resolve() for path in paths]
+    return [
+        file
+        for file in files
+        if any(path == file or path in file.parents for path in paths)
+    ]
+
+
+def restrict_lines(all_reports, line_ranges):
+    """Drop reports that are out of the given line ranges, see
+    `vcs.changed_lines`."""
+
+    if line_ranges is None:
+        yield from all_reports
+        return
+
+    from it import vcs
+
+    line_ranges = {str(file): ranges for file, ranges in line_ranges.items()}
+    for reports in all_reports:
+        if isinstance(reports, ReportBatch):
+            ranges = line_ranges.get(reports.filename)
+            yield reports.filter(
+                lambda plugin, code, lineno, column: vcs.in_ranges(
+                    lineno, ranges
+                )
             )
-            logger.info("\n" + _prepare_result(reports))
-            exit(int(session.config.fail_exit))
         else:
+            filtered = {}
+            for plugin, plugin_reports in reports.items():
+                plugin_reports = [
+                    report
+                    for report in plugin_reports
+                    if vcs.in_ranges(
+                        report["lineno"], line_ranges.get(report["filename"])
+                    )
+                ]
+                if plugin_reports:
+                    filtered[plugin] = plugin_reports
+            yield filtered
+
+
+def prepare_reporter(format, output=None):
+    if output is None:
+        stream = sys.stdout
+    else:
+        stream = open(output, "w", newline="")
+    return Reporter.formats[format](stream)
+
+
+def show_reports(session, all_reports, reporter=None):
+    if reporter is None:
+        found = log_reports(all_reports)
+    else:
+        found = False
+        with reporter:
+            for reports in all_reports:
+                found = found or bool(reports)
+                reporter.write_reports(reports)
+        if reporter.stream is not sys.stdout:
+            reporter.stream.close()
+
+    session.shutdown()
+    if session.profile is not None:
+        show_profile(session.profile, session.config)
+    if found:
+        exit(int(session.config.fail_exit))
+    elif reporter is None:
+        logger.info(
+            "InspectorTiger inspected \N{RIGHT-POINTING MAGNIFYING GLASS} "
+            "your code and it is perfect \N{WHITE HEAVY CHECK MARK}"
+        )
+
+
+def show_profile(profile, config):
+    if config.profile_format == "json":
+        output = json.dumps(profile.as_dict(), indent=4) + "\n"
+    else:
+        output = profile.format_table()
+
+    if config.profile_output is not None:
+        config.profile_output.write_text(output)
+    elif config.profile_format == "json":
+        sys.stderr.write(output)
+    else:
+        logger.info("Profile of the hooks;\n" + output)
+
+
+def log_reports(all_reports):
+    found = False
+    for reports in all_reports:
+        if not reports:
+            continue
+        if not found:
+            found = True
             logger.info(
-                "InspectorTiger inspected \N{right-pointing magnifying glass} "
-                "your code and it is perfect \N{white heavy check mark}"
+                "InspectorTiger inspected \N{RIGHT-POINTING MAGNIFYING GLASS} "
+                "and found these problems;"
             )
-    else:
-        logger.info("Nothing to do!")
+        logger.info("\n" + _prepare_result(reports))
+    return found
 
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+"""Content addressed, size bounded caches (on-disk and in-memory) for
+inspection results."""
+
+import hashlib
+import os
+import sys
+from collections import OrderedDict
+from importlib.util import find_spec
+from pathlib import Path
+
+from it.utils import logger
+
+# the cache directory is only scanned (see `Cache.checkpoint`) once in
+# this many runs, unless the estimated size passes the limit
+PRUNE_INTERVAL = 32
+
+_CORE_MODULES = ("it.inspector", "it.pattern", "it.reports", "it.utils")
+
+
+def _module_hash(name):
+    try:
+        spec = find_spec(name)
+    except (ImportError, ValueError):
+        spec = None
+
+    if spec is None or not spec.has_location:
+        return "<missing>"
+
+    with open(spec.origin, "rb") as module:
+        return hashlib.sha256(module.read()).hexdigest()
+
+
+def fingerprint(plugins, ignored_codes=()):
+    """Fingerprint of everything (except the source itself) that can
+    change the result of an inspection; python version, core modules,
+    the active plugin set (their static names and module hashes) and
+    the ignored codes."""
+
+    state = hashlib.sha256()
+    state.update(sys.implementation.cache_tag.encode())
+    state.update(repr(tuple(sys.version_info)).encode())
+    for module in _CORE_MODULES:
+        state.update(f"{module}:{_module_hash(module)}\n".encode())
+
+    for plugin in sorted(plugins, key=lambda plugin: plugin.static_name):
+        module_hash = _module_hash(plugin.static_name)
+        state.update(
+            f"{plugin.static_name}:{plugin.inactive}:{module_hash}\n".encode()
+        )
+    state.update(repr(sorted(set(ignored_codes))).encode())
+    return state.hexdigest()
+
+
+def _key(fingerprint, content):
+    state = hashlib.sha256(fingerprint.encode())
+    state.update(content)
+    return state.hexdigest()
+
+
+class Cache:
+    def __init__(self, directory, fingerprint, max_size):
+        self.directory = Path(directory)
+        self.fingerprint = fingerprint
+        self.max_size = max_size
+        # bytes written since the last checkpoint
+        self.written = 0
+
+    def key(self, content):
+        return _key(self.fingerprint, content)
+
+    def path(self, key):
+        return self.directory / key[:2] / key[2:]
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as entry:
+                payload = entry.read()
+            os.utime(path)
+        except OSError:
+            return None
+        else:
+            return payload
+
+    def set(self, key, payload):
+        path = self.path(key)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temporary, "wb") as entry:
+                entry.write(payload)
+            os.replace(temporary, path)
+        except OSError:
+            logger.debug(f"Couldn't write cache entry to {path!s}.")
+        else:
+            self.written += len(payload)
+
+    def entries(self):
+        if not self.directory.exists():
+            return
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.is_file(follow_symlinks=False):
+                    yield entry
+
+    def checkpoint(self):
+        """Add the bytes written since the last checkpoint to the size
+        estimate stored in the cache directory. The cache is only pruned
+        when the estimate passes `max_size`, or once every `PRUNE_INTERVAL`
+        checkpoints (the estimate doesn't know about the overwrites, or the
+        entries written by the other sessions)."""
+
+        state = self.directory / "state"
+        try:
+            size, runs = map(int, state.read_text().split())
+        except (OSError, ValueError):
+            size, runs = None, 0
+
+        written, self.written = self.written, 0
+        runs += 1
+        if (
+            size is None
+            or size + written > self.max_size
+            or runs >= PRUNE_INTERVAL
+        ):
+            size, runs = self.prune(), 0
+        else:
+            size += written
+
+        temporary = state.with_name(f"{state.name}.{os.getpid()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temporary.write_text(f"{size} {runs}\n")
+            os.replace(temporary, state)
+        except OSError:
+            logger.debug(f"Couldn't write the cache state to {state!s}.")
+
+    def prune(self):
+        """Evict least recently used entries until the total size
+        of the cache fits into `max_size`, and return the remaining
+        size."""
+
+        entries = []
+        total_size = 0
+        for entry in self.entries():
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+        return total_size
+
+
+class MemoryCache:
+    """In-memory LRU cache, bounded by both the number of entries and
+    their total size (in bytes)."""
+
+    def __init__(self, fingerprint, max_entries, max_size):
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, content):
+        return _key(self.fingerprint, content)
+
+    def get(self, key):
+        payload = self._entries.get(key)
+        if payload is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return payload
+
+    def set(self, key, payload):
+        if len(payload) > self.max_size or self.max_entries < 1:
+            return
+
+        if key in self._entries:
+            self.size -= len(self._entries.pop(key))
+        self._entries[key] = payload
+        self.size += len(payload)
+        while len(self._entries) > self.max_entries or (
+            self.size > self.max_size
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self),
+            "size": self.size,
+        }
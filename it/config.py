@@ -1,10 +1,18 @@
 import json
 import logging
+import os
 from dataclasses import dataclass, field
-from multiprocessing import cpu_count
-from typing import List
+from pathlib import Path
+from typing import List, Optional
 
 from it.plugin import Plugin
+from it.utils import (
+    CACHE_DIR,
+    CACHE_SIZE,
+    DAEMON_SOCKET,
+    DAEMON_TIMEOUT,
+    WATCH_INTERVAL,
+)
 
 
 @dataclass
@@ -28,12 +36,28 @@ class Blacklist:
 @dataclass
 class Config:
     serial: bool = False
-    workers: int = cpu_count()
+    workers: int = os.cpu_count() or 1
     fail_exit: bool = True
     load_core: bool = True
     logging_level: int = logging.INFO
     logging_handler_level: int = logging.INFO
 
+    cache: bool = True
+    cache_dir: Path = CACHE_DIR
+    cache_size: int = CACHE_SIZE
+
+    daemon_socket: Path = DAEMON_SOCKET
+    daemon_timeout: float = DAEMON_TIMEOUT
+
+    watch_interval: float = WATCH_INTERVAL
+    inotify: bool = True
+
+    exclude: List[str] = field(default_factory=list)
+    gitignore: bool = True
+    profile: bool = False
+    profile_format: str = "table"
+    profile_output: Optional[Path] = None
+
     plugins: List[Plugin] = field(default_factory=list)
     blacklist: Blacklist = field(default_factory=Blacklist)
 
@@ -44,6 +68,12 @@ class Config:
         if isinstance(self.blacklist, dict):
             self.blacklist = Blacklist(**self.blacklist)
 
+        if isinstance(self.cache_dir, str):
+            self.cache_dir = Path(self.cache_dir).expanduser()
+
+        if isinstance(self.daemon_socket, str):
+            self.daemon_socket = Path(self.daemon_socket).expanduser()
+
     def read(self, path):
         return self.update(self._parse_config(path))
 
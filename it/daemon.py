@@ -0,0 +1,187 @@
+"""A warm inspection daemon which keeps a started `Session` (and its
+process pool) alive behind a local unix socket."""
+
+import json
+import os
+import socket
+from pathlib import Path
+
+from it.utils import logger, traverse_paths
+
+BUFFER_SIZE = 64 * 1024
+# seconds the client waits for each read/write of a request (the daemon
+# doesn't answer before the whole inspection is done)
+REQUEST_TIMEOUT = 10 * 60
+
+
+class DaemonError(ConnectionError):
+    pass
+
+
+def _receive(connection):
+    # Messages are newline delimited, since the forked workers might
+    # hold a copy of the connection and the EOF would never come.
+    chunks = []
+    while True:
+        chunk = connection.recv(BUFFER_SIZE)
+        if not chunk:
+            raise DaemonError("Connection was closed before a full message")
+        chunks.append(chunk)
+        if chunk.endswith(b"\n"):
+            break
+    try:
+        return json.loads(b"".join(chunks).decode())
+    except ValueError as exc:
+        raise DaemonError(f"Received a malformed message: {exc}") from exc
+
+
+def _send(connection, **data):
+    connection.sendall(json.dumps(data).encode() + b"\n")
+
+
+def handle_request(session, request):
+    paths = [Path(path) for path in request["paths"]]
+    ignored_codes = set(request.get("ignore_code", ()))
+
+    # codes ignored by the daemon are never reported, the clients have to
+    # ignore them as well (the rest are filtered below)
+    missing_codes = set(session.config.blacklist.codes) - ignored_codes
+    if missing_codes:
+        raise DaemonError(
+            f"Daemon ignores codes that the client doesn't "
+            f"({', '.join(sorted(missing_codes))})"
+        )
+
+    # ignoring a plugin changes which hooks are loaded, so the clients can
+    # only be served with the same plugin blacklist
+    ignored_plugins = {
+        plugin.static_name for plugin in session.config.blacklist.plugins
+    }
+    if set(request.get("ignore_plugin", ignored_plugins)) != ignored_plugins:
+        raise DaemonError(
+            f"Daemon ignores a different set of plugins "
+            f"({', '.join(sorted(ignored_plugins)) or 'none'})"
+        )
+
+    files = traverse_paths(
+        paths,
+        request.get("exclude", session.config.exclude),
+        request.get("gitignore", session.config.gitignore),
+    )
+    reports = session.bulk_inspection(*files)
+    result = {}
+    for plugin, plugin_reports in reports.items():
+        plugin_reports = [
+            report
+            for report in plugin_reports
+            if report["code"] not in ignored_codes
+        ]
+        if plugin_reports:
+            result[plugin] = plugin_reports
+    return result
+
+
+def _is_listening(address):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(os.fspath(address))
+        except OSError:
+            return False
+    return True
+
+
+def serve(session):
+    """Serve inspection requests until the daemon stays idle for
+    `daemon_timeout` seconds."""
+
+    address = session.config.daemon_socket
+    address.parent.mkdir(parents=True, exist_ok=True)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        if address.exists():
+            if _is_listening(address):
+                raise DaemonError(
+                    f"Another daemon is already listening at {address!s}"
+                )
+            # left behind by a daemon that didn't exit cleanly
+            address.unlink()
+        server.bind(str(address))
+        server.listen()
+        server.settimeout(session.config.daemon_timeout)
+        if not session.config.serial:
+            # spawn the workers before the first request
+            tuple(session.pool.map(abs, range(session.config.workers)))
+        logger.info(f"Daemon is listening at {address!s}")
+
+        try:
+            while True:
+                try:
+                    connection, _ = server.accept()
+                except socket.timeout:
+                    logger.info("Daemon was idle for too long, exiting.")
+                    break
+
+                with connection:
+                    connection.settimeout(None)
+                    try:
+                        request = _receive(connection)
+                    except (DaemonError, OSError) as exc:
+                        logger.debug(f"Dropped a connection: {exc}")
+                        continue
+
+                    try:
+                        result = handle_request(session, request)
+                    except DaemonError as exc:
+                        response = {"status": "fail", "message": str(exc)}
+                    except Exception as exc:
+                        logger.exception("Couldn't handle the request")
+                        response = {"status": "fail", "message": repr(exc)}
+                    else:
+                        response = {"status": "success", "result": result}
+
+                    try:
+                        _send(connection, **response)
+                    except OSError as exc:
+                        logger.debug(f"Couldn't send the response: {exc}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            address.unlink()
+            session.shutdown()
+
+
+def request(address, paths, config):
+    """Forward given paths (along with the blacklist and the discovery
+    options of the given config) to the daemon listening at `address`
+    and return the inspection reports (grouped by plugin)."""
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(REQUEST_TIMEOUT)
+        try:
+            connection.connect(os.fspath(address))
+        except OSError as exc:
+            raise DaemonError(
+                f"Couldn't reach the daemon at {address!s}"
+            ) from exc
+
+        try:
+            _send(
+                connection,
+                paths=[os.path.abspath(path) for path in paths],
+                ignore_code=list(config.blacklist.codes),
+                ignore_plugin=[
+                    plugin.static_name for plugin in config.blacklist.plugins
+                ],
+                exclude=list(config.exclude),
+                gitignore=config.gitignore,
+            )
+            response = _receive(connection)
+        except DaemonError:
+            raise
+        except OSError as exc:
+            raise DaemonError(
+                f"Lost the connection to the daemon at {address!s}"
+            ) from exc
+
+    if response["status"] != "success":
+        raise DaemonError(response["message"])
+    return response["result"]
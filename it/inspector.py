@@ -1,9 +1,12 @@
 import ast
+import re
 import tokenize
-from collections import defaultdict
+from collections import Counter, defaultdict
 from contextlib import contextmanager, suppress
 from functools import lru_cache, partial
+from types import MappingProxyType
 
+from it.pattern import Pattern, _as_tuple, guard, pattern
 from it.reports import Report
 from it.utils import Events, Priority, _version_node, logger, mark
 
@@ -20,6 +23,104 @@ class BufferExit(Exception):
     pass
 
 
+def _node_types(base=ast.AST):
+    for node_type in base.__subclasses__():
+        yield node_type
+        yield from _node_types(node_type)
+
+
+_SIGNATURE = re.compile(r"(\w+)\((.*)\)")
+
+
+def _child_types(node_type):
+    """Node types that might be a direct child of the given node type,
+    according to the ASDL signature in its docstring (unknown layouts
+    might contain anything, deprecated ones are never produced)."""
+
+    documentation = node_type.__doc__ or ""
+    signature = _SIGNATURE.fullmatch(documentation)
+    if signature is None or signature.group(1) != node_type.__name__:
+        if node_type._fields and not documentation.startswith("Deprecated"):
+            return set(_node_types())
+        return set()
+
+    child_types = set()
+    for field in signature.group(2).split(","):
+        field_type = getattr(ast, field.split()[0].rstrip("*?"), None)
+        if isinstance(field_type, type) and issubclass(field_type, ast.AST):
+            child_types.add(field_type)
+            child_types.update(_node_types(field_type))
+    return child_types
+
+
+@lru_cache(1)
+def _reachable_types():
+    """A mapping of node types to all node types that might appear
+    somewhere in their subtrees."""
+
+    grammar = {
+        node_type: _child_types(node_type) for node_type in _node_types()
+    }
+    reachable = {}
+    for node_type, child_types in grammar.items():
+        seen = set()
+        stack = list(child_types)
+        while stack:
+            child_type = stack.pop()
+            if child_type not in seen:
+                seen.add(child_type)
+                stack.extend(grammar.get(child_type, ()))
+        reachable[node_type] = frozenset(seen)
+    return reachable
+
+
+def _handlers_of(node_type, event_hooks):
+    return tuple(
+        event_hook
+        for event_hook in event_hooks
+        if issubclass(node_type, tuple(event_hook.handles))
+    )
+
+
+def _resolve_hooks(node_type, hooks, finalizers, preparers):
+    return (
+        tuple(hooks.get(node_type, ())),
+        _handlers_of(node_type, finalizers),
+        _handlers_of(node_type, preparers),
+        True,
+    )
+
+
+@lru_cache(8)
+def compile_dispatch(hooks, finalizers, preparers):
+    """Compile a frozen `node type => (hooks, finalizers, preparers,
+    descend)` table for the given hook set (a tuple of `(node type, hooks)`
+    pairs, a tuple of node finalizers and a tuple of node preparers).
+
+    `descend` is false for the node types whose subtrees can't contain
+    any node type with hooks or finalizers (so the traversal can skip
+    them, node preparers won't see the nodes in these subtrees either)."""
+
+    hooks = dict(hooks)
+    table = {
+        node_type: _resolve_hooks(node_type, hooks, finalizers, preparers)
+        for node_type in _node_types()
+        if _version_node(node_type.__name__)
+    }
+
+    hooked = {
+        node_type
+        for node_type, (hooks, finalizers, *_) in table.items()
+        if hooks or finalizers
+    }
+    reachable = _reachable_types()
+    for node_type, entry in table.items():
+        reachable_types = reachable.get(node_type)
+        if reachable_types and reachable_types.isdisjoint(hooked):
+            table[node_type] = (*entry[:3], False)
+    return MappingProxyType(table)
+
+
 class Inspector(ast.NodeVisitor):
 
     _hooks = defaultdict(list)
@@ -28,7 +129,14 @@ class Inspector(ast.NodeVisitor):
     _hooks_buffer = defaultdict(list)
     _event_hooks_buffer = defaultdict(list)
 
-    def __init__(self, source, *args, **kwargs):
+    def __init__(
+        self,
+        source,
+        *args,
+        ignored_codes=frozenset(),
+        profile=None,
+        **kwargs,
+    ):
         if isinstance(source, ast.AST):
             self.file = "<unknown>"
             self.source = source
@@ -38,9 +146,15 @@ class Inspector(ast.NodeVisitor):
 
         self._hook_db = defaultdict(partial(defaultdict, dict))
         self.results = defaultdict(list)
+        self.stats = Counter()
+        self.ignored_codes = frozenset(ignored_codes)
         self.sort_hooks()
+        self.profile = profile
+        self.dispatch = self.dispatch_table()
+        if profile is not None:
+            self.dispatch = profile.instrument(self.dispatch)
 
-        for initalizer in self._event_hooks[Events.INITAL]:
+        for initalizer in self.event_hooks(Events.INITAL):
             initalizer(self._hook_db)
 
         super().__init__(*args, **kwargs)
@@ -51,7 +165,28 @@ class Inspector(ast.NodeVisitor):
 
     @classmethod
     def register(cls, *nodes):
+        """Register the decorated function as a hook of the given node
+        types. Patterns (see `it.pattern`) can be given instead, the hook
+        is then only called for the nodes that match one of them."""
+
+        patterns = [node for node in nodes if isinstance(node, Pattern)]
+        if patterns:
+            patterns.extend(
+                pattern(node)
+                for node in nodes
+                if not isinstance(node, Pattern)
+            )
+            nodes = tuple(
+                dict.fromkeys(
+                    node_type
+                    for node in patterns
+                    for node_type in _as_tuple(node.node_type)
+                )
+            )
+
         def wrapper(func):
+            if patterns:
+                func = guard(func, patterns)
             mark(func)
 
             handles = set(nodes)
@@ -115,36 +250,134 @@ class Inspector(ast.NodeVisitor):
                         hooks.remove(hook)
             hooks.sort(key=priority)
 
-    def visitor(self, hooks, node):
-        for hook in hooks:
-            logger.debug("Visiting {type(node).__name__}.")
-            if hook(node, self._hook_db):
-                code = hook.__name__.upper()
-                plugin = getattr(hook, "plugin", "unknown")
-                if not hasattr(node, "lineno"):
-                    node.lineno = 0
-                    node.col_offset = 0
-
-                report = Report(
-                    code, node.col_offset, node.lineno, str(self.file)
+    def dispatch_table(self):
+        return compile_dispatch(
+            tuple(
+                (trigger, hooks)
+                for trigger, hooks in (
+                    (trigger, self._active_hooks(hooks))
+                    for trigger, hooks in self._hooks.items()
                 )
-                self.results[plugin.plugin].append(report)
+                if hooks
+            ),
+            tuple(self._event_hooks[Events.NODE_FINALIZE]),
+            tuple(self._event_hooks[Events.NODE_PREPARE]),
+        )
+
+    def event_hooks(self, event):
+        if self.profile is None:
+            return self._event_hooks[event]
+        return self.profile.instrument_hooks(self._event_hooks[event])
+
+    def _active_hooks(self, hooks):
+        return tuple(
+            hook
+            for hook in hooks
+            if hook.__name__.upper() not in self.ignored_codes
+        )
+
+    def resolve(self, node_type):
+        try:
+            return self.dispatch[node_type]
+        except KeyError:
+            return _resolve_hooks(
+                node_type,
+                {node_type: self._active_hooks(self._hooks[node_type])},
+                self._event_hooks[Events.NODE_FINALIZE],
+                self._event_hooks[Events.NODE_PREPARE],
+            )
+
+    def prepare(self, tree):
+        """Flatten the given tree into pre-order and run all node
+        preparers (`Events.NODE_PREPARE`) on the way, with a single
+        traversal. Returns the flattened nodes, their dispatch entries,
+        the (exclusive) end index of each node's subtree and the index of
+        each node's parent.
+
+        Subtrees which can't contain any hooked node type are pruned."""
+
+        nodes, entries, parents = [], [], []
+        stack = [(tree, None, -1)]
+        while stack:
+            node, parent, parent_index = stack.pop()
+            index = len(nodes)
+            entry = self.resolve(type(node))
+            nodes.append(node)
+            entries.append(entry)
+            parents.append(parent_index)
+
+            for preparer in entry[2]:
+                preparer(node, parent, self._hook_db)
 
-        self.generic_visit(node)
-        for node_finalizer in self._event_hooks[Events.NODE_FINALIZE]:
-            if isinstance(node, tuple(node_finalizer.handles)):
-                node_finalizer(node, self._hook_db)
+            if not entry[3]:
+                self.stats["pruned"] += 1
+                continue
+
+            children = []
+            for field in node._fields:
+                value = getattr(node, field, None)
+                if isinstance(value, ast.AST):
+                    children.append((value, node, index))
+                elif isinstance(value, list):
+                    children.extend(
+                        (item, node, index)
+                        for item in value
+                        if isinstance(item, ast.AST)
+                    )
+            children.reverse()
+            stack.extend(children)
+
+        self.stats["visited"] += len(nodes)
+        ends = list(range(1, len(nodes) + 1))
+        for index in range(len(nodes) - 1, 0, -1):
+            parent_index = parents[index]
+            if ends[index] > ends[parent_index]:
+                ends[parent_index] = ends[index]
+        return nodes, entries, ends, parents
+
+    def visit(self, node):
+        db = self._hook_db
+        nodes, entries, ends, parents = self.prepare(node)
+        # shared with the plugins that query the tree in bulk (see
+        # `it.plugins.table`), until the end of the inspection
+        db["inspector"]["flattened"] = nodes, entries, ends, parents
+
+        pending = []
+        for index, node in enumerate(nodes):
+            while pending and pending[-1][0] <= index:
+                _, finalized, finalizers = pending.pop()
+                for finalizer in finalizers:
+                    finalizer(finalized, db)
+
+            hooks, finalizers, *_ = entries[index]
+            for hook in hooks:
+                if hook(node, db):
+                    self.report(hook, node)
+
+            if finalizers:
+                pending.append((ends[index], node, finalizers))
+
+        while pending:
+            _, finalized, finalizers = pending.pop()
+            for finalizer in finalizers:
+                finalizer(finalized, db)
+
+    def report(self, hook, node):
+        code = hook.__name__.upper()
+        plugin = getattr(hook, "plugin", "unknown")
+        if not hasattr(node, "lineno"):
+            node.lineno = 0
+            node.col_offset = 0
+
+        report = Report(code, node.col_offset, node.lineno, str(self.file))
+        self.results[plugin.plugin].append(report)
 
     def handle(self):
         tree = ast.parse(self.source, self.file)
-        for tree_transformer in self._event_hooks[Events.TREE_TRANSFORMER]:
+        for tree_transformer in self.event_hooks(Events.TREE_TRANSFORMER):
             tree = tree_transformer(tree, self._hook_db)
         self.visit(tree)
+        for finalizer in self.event_hooks(Events.FINAL):
+            finalizer(self._hook_db)
+        self._hook_db.pop("inspector", None)
         return self.results
-
-    @lru_cache(128)
-    def __getattr__(self, attr):
-        _attr = attr[len("visit_") :]
-        if hasattr(ast, _attr) and _version_node(_attr):
-            return partial(self.visitor, self._hooks[getattr(ast, _attr)])
-        raise AttributeError(attr)
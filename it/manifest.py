@@ -0,0 +1,130 @@
+"""A static manifest of the plugins (their hooks, node types, codes,
+requirements and python versions), so that a session can decide which
+plugins it needs without importing them. Regenerate it with
+`bin/generate_manifest.py` after changing a plugin."""
+
+import json
+from functools import lru_cache
+from importlib import import_module
+from pathlib import Path
+
+import it.plugins
+from it.cache import _module_hash
+from it.inspector import Inspector
+from it.utils import ismarked, logger
+
+BASE = Path(it.plugins.__file__).parent
+MANIFEST = BASE / "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def discover_plugins(base=BASE):
+    """Static names of all plugin modules under the given package
+    directory."""
+
+    for module in sorted(base.glob("**/*.py")):
+        if module.name == "__init__.py":
+            continue
+        parts = module.relative_to(base).with_suffix("").parts
+        yield ".".join((it.plugins.__name__, *parts))
+
+
+def describe_plugin(static_name):
+    """Import the plugin module and describe its hooks."""
+
+    module = import_module(static_name)
+    hooks = []
+    for name in sorted(vars(module)):
+        hook = getattr(module, name)
+        if not ismarked(hook) or hook.__module__ != static_name:
+            continue
+
+        reports = any(
+            hook in node_hooks for node_hooks in Inspector._hooks.values()
+        )
+        events = sorted(
+            event.name
+            for event, event_hooks in Inspector._event_hooks.items()
+            if hook in event_hooks
+        )
+        hooks.append(
+            {
+                "name": hook.__name__,
+                # only node hooks (not the event hooks) report codes
+                "code": hook.__name__.upper() if reports else None,
+                "node_types": sorted(
+                    node_type.__name__
+                    for node_type in getattr(hook, "handles", ())
+                ),
+                "events": events,
+                "requires": sorted(
+                    requirement.static_name
+                    for requirement in getattr(hook, "requires", ())
+                ),
+            }
+        )
+
+    return {
+        "digest": _module_hash(static_name),
+        "python_version": list(getattr(module, "__py_version__", ())),
+        "hooks": hooks,
+    }
+
+
+def build_manifest(static_names):
+    return {
+        "version": MANIFEST_VERSION,
+        "plugins": {
+            static_name: describe_plugin(static_name)
+            for static_name in static_names
+        },
+    }
+
+
+@lru_cache(1)
+def load_manifest(path=MANIFEST):
+    try:
+        with open(path) as manifest:
+            manifest = json.load(manifest)
+    except (OSError, ValueError):
+        logger.debug(f"Couldn't read the plugin manifest at {path!s}.")
+        return {}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest["plugins"]
+
+
+def lookup(plugin, path=MANIFEST):
+    """Manifest entry of the given plugin, or None if it isn't listed (or
+    the module changed since the manifest was generated)."""
+
+    entry = load_manifest(path).get(plugin.static_name)
+    if entry is None or entry["digest"] != _module_hash(plugin.static_name):
+        return None
+    return entry
+
+
+def needed_plugins(entries, ignored_codes=()):
+    """Static names of the plugins (from the given `static name => entry`
+    mapping) that have to be imported. Plugins with event hooks are always
+    needed, plugins with only node hooks are needed if at least one of
+    their codes isn't ignored (or a needed hook requires them)."""
+
+    ignored_codes = set(ignored_codes)
+    needed = set()
+    requirements = []
+    for static_name, entry in entries.items():
+        for hook in entry["hooks"]:
+            if hook["events"] or hook["code"] not in ignored_codes:
+                needed.add(static_name)
+                requirements.extend(hook["requires"])
+
+    while requirements:
+        static_name = requirements.pop()
+        if static_name in needed or static_name not in entries:
+            continue
+        needed.add(static_name)
+        for hook in entries[static_name]["hooks"]:
+            requirements.extend(hook["requires"])
+    return needed
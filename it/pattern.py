@@ -0,0 +1,389 @@
+"""Declarative node patterns for the hooks.
+
+A pattern describes the shape of a node with the conditions on its
+fields (sub patterns, node types, lengths, values);
+
+    @Inspector.register(
+        pattern(ast.Call, func=name("list"), args=items(ast.GeneratorExp))
+    )
+    def list_of_generator(node, db):
+        return True
+
+The hook is only called for the nodes that match one of its patterns.
+All patterns of a node type are compiled into a single decision tree,
+so the conditions that are shared between them (e.g `node.func` being a
+name) are only tested once for each node, no matter how many hooks use
+them.
+"""
+
+import ast
+from collections import Counter, defaultdict
+from functools import wraps
+
+from it.utils import constant_check
+
+MISSING = object()
+
+
+class Pattern:
+    def tests(self, path=()):
+        """Yield `(path, test)` pairs, where a test is a hashable tuple
+        whose first item is its kind (see `_evaluate`)."""
+
+        raise NotImplementedError
+
+    def match(self, node):
+        return all(
+            _evaluate(test, _get(node, path)) for path, test in self.tests()
+        )
+
+
+class _Any(Pattern):
+    def tests(self, path=()):
+        return ()
+
+    def __repr__(self):
+        return "ANY"
+
+
+ANY = _Any()
+
+
+class _Node(Pattern):
+    def __init__(self, node_type, fields):
+        self.node_type = node_type
+        self.fields = {
+            field: _as_pattern(value) for field, value in fields.items()
+        }
+
+    def tests(self, path=()):
+        yield path, ("type", self.node_type)
+        for field, value in self.fields.items():
+            yield from value.tests((*path, field))
+
+    def __repr__(self):
+        fields = "".join(f", {k}={v!r}" for k, v in self.fields.items())
+        return f"pattern({_type_name(self.node_type)}{fields})"
+
+
+class _Test(Pattern):
+    def __init__(self, kind, argument):
+        self.test = (kind, argument)
+
+    def tests(self, path=()):
+        yield path, self.test
+
+    def __repr__(self):
+        return f"{self.test[0]}({self.test[1]!r})"
+
+
+class _Items(Pattern):
+    def __init__(self, patterns):
+        self.patterns = tuple(map(_as_pattern, patterns))
+
+    def tests(self, path=()):
+        yield path, ("len", len(self.patterns))
+        for index, value in enumerate(self.patterns):
+            yield from value.tests((*path, index))
+
+    def __repr__(self):
+        return f"items{self.patterns!r}"
+
+
+def pattern(node_type, **fields):
+    """A node of the given type (or types) whose fields match the given
+    values (patterns, node types or lists of them, see `items`)."""
+
+    return _Node(node_type, fields)
+
+
+def name(*ids):
+    """A name with one of the given identifiers."""
+
+    return pattern(ast.Name, id=one_of(*ids))
+
+
+def one_of(*values):
+    return _Test("in", frozenset(values))
+
+
+def length(size):
+    return _Test("len", size)
+
+
+def items(*patterns):
+    """A list of exactly these items."""
+
+    return _Items(patterns)
+
+
+def constant(*values):
+    return _Test("constant", values)
+
+
+def not_(value):
+    return _Test("not", _as_pattern(value))
+
+
+def _as_pattern(value):
+    if isinstance(value, Pattern):
+        return value
+    elif isinstance(value, (type, tuple)):
+        return _Test("type", value)
+    elif isinstance(value, list):
+        return _Items(value)
+    else:
+        raise TypeError(f"{value!r} can't be used as a pattern")
+
+
+def _as_tuple(node_types):
+    if isinstance(node_types, tuple):
+        return node_types
+    return (node_types,)
+
+
+def _type_name(node_type):
+    if isinstance(node_type, tuple):
+        return f"({', '.join(map(_type_name, node_type))})"
+    return f"ast.{node_type.__name__}"
+
+
+def _get(value, path):
+    for step in path:
+        if isinstance(step, int):
+            if isinstance(value, list) and step < len(value):
+                value = value[step]
+            else:
+                return MISSING
+        else:
+            value = getattr(value, step, MISSING)
+    return value
+
+
+def _evaluate(test, value):
+    kind, argument = test
+    if kind == "type":
+        return isinstance(value, argument)
+    elif kind == "len":
+        return isinstance(value, list) and len(value) == argument
+    elif kind == "in":
+        try:
+            return value in argument
+        except TypeError:
+            return False
+    elif kind == "constant":
+        return value is not MISSING and constant_check(value, *argument)
+    elif kind == "not":
+        return value is not MISSING and not argument.match(value)
+    else:
+        raise ValueError(f"Unknown test: {kind!r}")
+
+
+class _Branch:
+    __slots__ = ("accepts", "children")
+
+    def __init__(self):
+        self.accepts = []
+        self.children = {}
+
+
+class _Compiler:
+    """Generates the source of the decision tree, as nested `if`
+    statements (`one_of` tests on the same field become a single dict
+    lookup, that selects the branches to continue with)."""
+
+    MAX_DEPTH = 32
+
+    def __init__(self):
+        self.namespace = {
+            "MISSING": MISSING,
+            "_get": _get,
+            "_evaluate": _evaluate,
+            "_functions": [],
+        }
+        self.functions = []
+        self.counter = 0
+
+    def constant(self, value):
+        name = f"_c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def variable(self):
+        self.counter += 1
+        return f"_v{self.counter}"
+
+    def value(self, path):
+        if all(isinstance(step, str) for step in path):
+            source = "node"
+            for field in path:
+                source = f"getattr({source}, {field!r}, MISSING)"
+            return source
+        return f"_get(node, {self.constant(path)})"
+
+    def test(self, test, variable):
+        kind, argument = test
+        if kind == "type":
+            return f"isinstance({variable}, {self.constant(argument)})"
+        elif kind == "len":
+            return (
+                f"isinstance({variable}, list) "
+                f"and len({variable}) == {argument!r}"
+            )
+        else:
+            return f"_evaluate({self.constant(test)}, {variable})"
+
+    def function(self, branch):
+        index = len(self.functions)
+        self.functions.append(None)
+        lines = [f"def _match_{index}(node, matched):"]
+        self.branch(branch, lines, 1)
+        lines.append("    return matched")
+        self.functions[index] = "\n".join(lines)
+        return index
+
+    def branch(self, branch, lines, depth):
+        indent = "    " * depth
+        if depth > self.MAX_DEPTH:
+            index = self.function(branch)
+            lines.append(f"{indent}_functions[{index}](node, matched)")
+            return
+
+        if branch.accepts:
+            accepts = self.constant(tuple(branch.accepts))
+            lines.append(f"{indent}matched.extend({accepts})")
+
+        switches = defaultdict(lambda: defaultdict(list))
+        for (path, test), child in branch.children.items():
+            if test[0] == "in":
+                index = self.function(child)
+                for value in test[1]:
+                    switches[path][value].append(index)
+                continue
+
+            variable = self.variable()
+            lines.append(f"{indent}{variable} = {self.value(path)}")
+            lines.append(f"{indent}if {self.test(test, variable)}:")
+            self.branch(child, lines, depth + 1)
+
+        for path, cases in switches.items():
+            variable = self.variable()
+            cases = self.constant(
+                {value: tuple(indexes) for value, indexes in cases.items()}
+            )
+            lines.extend(
+                [
+                    f"{indent}{variable} = {self.value(path)}",
+                    f"{indent}try:",
+                    f"{indent}    {variable} = {cases}.get({variable}, ())",
+                    f"{indent}except TypeError:",
+                    f"{indent}    {variable} = ()",
+                    f"{indent}for _index in {variable}:",
+                    f"{indent}    _functions[_index](node, matched)",
+                ]
+            )
+
+        if not branch.accepts and not branch.children:
+            lines.append(f"{indent}pass")
+
+    def compile(self, root):
+        self.function(root)
+        exec("\n\n".join(self.functions), self.namespace)
+        self.namespace["_functions"].extend(
+            self.namespace[f"_match_{index}"]
+            for index in range(len(self.functions))
+        )
+        return self.namespace["_match_0"]
+
+
+def compile_patterns(patterns):
+    """Compile the given `(key, pattern)` pairs into a decision tree, and
+    return a function that takes a node and returns the keys of all
+    matching patterns. Tests of each pattern are ordered by how many
+    patterns share them, so the common ones end up as shared prefixes."""
+
+    conditions = [
+        (key, list(dict.fromkeys(pattern.tests())))
+        for key, pattern in patterns
+    ]
+    frequency = Counter(
+        condition for _, tests in conditions for condition in tests
+    )
+    order = {condition: index for index, condition in enumerate(frequency)}
+
+    root = _Branch()
+    for key, tests in conditions:
+        branch = root
+        for condition in sorted(
+            tests, key=lambda item: (-frequency[item], order[item])
+        ):
+            branch = branch.children.setdefault(condition, _Branch())
+        branch.accepts.append(key)
+
+    match = _Compiler().compile(root)
+    return lambda node: match(node, [])
+
+
+class PatternSet:
+    """All patterns of a single node type. The decision tree is evaluated
+    once for each node (on the first hook), the rest of the hooks reuse
+    the result."""
+
+    def __init__(self):
+        self.patterns = []
+        self.node = None
+        self.keys = ()
+        self._matches = None
+
+    def add(self, pattern):
+        key = len(self.patterns)
+        self.patterns.append((key, pattern))
+        self.node = self._matches = None
+        return key
+
+    def matched(self, node):
+        if node is not self.node:
+            if self._matches is None:
+                self._matches = compile_patterns(self.patterns)
+            self.node = node
+            self.keys = self._matches(node)
+        return self.keys
+
+
+_PATTERN_SETS = {}
+
+
+def guard(hook, patterns):
+    """Wrap the hook, so that it is only called when the node matches
+    one of the given patterns."""
+
+    keys = []
+    for pattern in patterns:
+        for node_type in _as_tuple(pattern.node_type):
+            pattern_set = _PATTERN_SETS.setdefault(node_type, PatternSet())
+            keys.append((node_type, pattern_set, pattern_set.add(pattern)))
+
+    if len(keys) == 1:
+        ((_, pattern_set, key),) = keys
+
+        @wraps(hook)
+        def guarded_hook(node, db):
+            if node is pattern_set.node:
+                matched = pattern_set.keys
+            else:
+                matched = pattern_set.matched(node)
+            if key in matched:
+                return hook(node, db)
+
+    else:
+
+        @wraps(hook)
+        def guarded_hook(node, db):
+            for node_type, pattern_set, key in keys:
+                if type(node) is node_type and key in pattern_set.matched(
+                    node
+                ):
+                    return hook(node, db)
+
+    guarded_hook.patterns = tuple(patterns)
+    return guarded_hook
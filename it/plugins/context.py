@@ -6,11 +6,13 @@ Context management for AST (38+)
 - `db['context']['previous_contexts']` => Previous contexts
 - `db['context']['next_contexts']` => Next contexts
 - `db['context']['global_context']` => Global context
+- `db['context']['scopes']` => A nested interval index of all contexts (`ScopeIndex`)
 - `get_context(node, db)` => Infer context of given `node`
 """
 from __future__ import annotations
 
 import ast
+from bisect import bisect_right
 from dataclasses import dataclass
 from enum import Enum, auto
 from functools import wraps
@@ -57,6 +59,55 @@ class KPair:
 GLOBAL_CTX = Context("__main__", Contexts.GLOBAL, KPair(0, 0))
 
 
+def _positions(node):
+    return (
+        (node.lineno, node.col_offset),
+        (node.end_lineno, node.end_col_offset),
+    )
+
+
+def _reverse(position):
+    return tuple(-part for part in position)
+
+
+class ScopeIndex:
+    """An index of nested (or disjoint) scopes, sorted by their start
+    positions. Each scope points to the innermost scope that contains it,
+    so the innermost scope of a node is found with a binary search and
+    a walk through its enclosing scopes."""
+
+    def __init__(self, scopes=()):
+        self.starts = []
+        self.ends = []
+        self.parents = []
+        self.contexts = []
+
+        stack = []
+        for start, end, context in sorted(
+            scopes, key=lambda scope: (scope[0], _reverse(scope[1]))
+        ):
+            while stack and self.ends[stack[-1]] < end:
+                stack.pop()
+            self.parents.append(stack[-1] if stack else -1)
+            stack.append(len(self.contexts))
+
+            self.starts.append(start)
+            self.ends.append(end)
+            self.contexts.append(context)
+
+    def __len__(self):
+        return len(self.contexts)
+
+    def find(self, node):
+        start, end = _positions(node)
+        index = bisect_right(self.starts, start) - 1
+        while index >= 0:
+            if end <= self.ends[index]:
+                return self.contexts[index]
+            index = self.parents[index]
+        return None
+
+
 def _verify_module(func):
     @wraps(func)
     def wrapper(node, db):
@@ -69,17 +120,24 @@ def _verify_module(func):
 
 @_verify_module
 def get_context(node, db):
-    possible_contexts = []
-    node_kpair = KPair.from_node(node)
-    for kpair, context in db["context"]["next_contexts"].items():
-        if node_kpair.start >= kpair.start and node_kpair.end <= kpair.end:
-            possible_contexts.append((kpair.distance(node_kpair), context))
-
-    possible_contexts.sort(key=lambda ctx: ctx[0])
-    try:
-        return possible_contexts[0][1]
-    except IndexError:
+    context = db["context"]["scopes"].find(node)
+    if context is None:
         return db["context"]["global_context"]
+    return context
+
+
+@Inspector.on_event(Events.INITAL)
+def initalize_contexts(db):
+    db["context"]["scopes"] = []
+
+
+@Inspector.on_event(Events.NODE_PREPARE)
+@Inspector.register(*CTX_TYPES)
+def collect_contexts(node, parent, db):
+    kpair = KPair.from_node(node)
+    ctx = Context(node.name, CTX_TYPES[type(node)], kpair)
+    db["context"]["next_contexts"][ctx.kpair] = ctx
+    db["context"]["scopes"].append((*_positions(node), ctx))
 
 
 @Inspector.register(ast.Module)
@@ -88,12 +146,7 @@ def prepare_contexts(node, db):
     db["context"]["global_context"] = global_ctx = GLOBAL_CTX
     db["context"]["previous_contexts"] = []
     db["context"]["context"] = global_ctx
-    for possible_context in ast.walk(node):
-        if isinstance(possible_context, tuple(CTX_TYPES)):
-            kpair = KPair.from_node(possible_context)
-            ctx = CTX_TYPES[type(possible_context)]
-            ctx = Context(possible_context.name, ctx, kpair)
-            db["context"]["next_contexts"][ctx.kpair] = ctx
+    db["context"]["scopes"] = ScopeIndex(db["context"]["scopes"])
 
 
 @Inspector.register(ast.ClassDef, ast.FunctionDef)
@@ -8,13 +8,15 @@ Common gotchas
 __author__ = "Batuhan Taskaya"
 
 import ast
-import inspect
+import builtins
+from itertools import chain
+from types import MappingProxyType
 
 from it.inspector import Inspector
 from it.plugin import Plugin
 from it.plugins.context import get_context
 from it.plugins.parentize import parent_to
-from it.utils import name_check
+from it.plugins.table import find_nodes
 
 MUTABLE_TYPE = (ast.List, ast.Dict, ast.Set)
 
@@ -36,6 +38,7 @@ def default_mutable_arg(node, db):
 
 @Inspector.register(ast.Try)
 @Plugin.require("@context")
+@Plugin.require("@table")
 def control_flow_inside_finally(node, db):
     """A return/break/continue that would implicitly cancel any active exception.
 
@@ -49,49 +52,61 @@ def control_flow_inside_finally(node, db):
     """
 
     for subnode in node.finalbody:
-        for child in ast.walk(subnode):
-            if isinstance(child, ast.Return) and get_context(
-                child, db
-            ) is get_context(node, db):
-                return child
-            elif isinstance(child, (ast.Break, ast.Continue)) and not any(
+        for child in find_nodes(
+            subnode, (ast.Return, ast.Break, ast.Continue), db
+        ):
+            if isinstance(child, ast.Return):
+                if get_context(child, db) is get_context(node, db):
+                    return child
+            elif not any(
                 isinstance(parent, ast.For)
-                for parent in parent_to(child, node)
+                for parent in parent_to(child, node, db)
             ):
                 return child
-            else:
-                continue
 
 
-def traverse_exception(base, exceptions=None):
-    exceptions = exceptions or {}
+def _builtin_exceptions():
+    exceptions = {}
+    for name, value in vars(builtins).items():
+        if isinstance(value, type) and issubclass(value, BaseException):
+            # aliases (e.g IOError) are listed with their own names too
+            exceptions[name] = tuple(
+                dict.fromkeys(
+                    (name, *(base.__name__ for base in value.__mro__[:-1]))
+                )
+            )
+    return exceptions
 
-    if base.__name__ not in exceptions:
-        exceptions[base.__name__] = ()
 
-    for exc in base.__subclasses__():
-        exceptions[exc.__name__] = tuple(
-            base.__name__
-            for base in inspect.getmro(exc)
-            if issubclass(base, BaseException)
-        )
-        traverse_exception(exc, exceptions)
+# name => names of itself and its bases, only for the builtin exceptions
+# (so it doesn't depend on what is imported). user defined exceptions are
+# kept in each inspection's own overlay (db["general"]["user_exceptions"])
+EXC_TREE = MappingProxyType(_builtin_exceptions())
+ALL_EXCS = EXC_TREE.keys()
 
-    return exceptions.copy()
 
+def get_exception(name, db):
+    """Name of the given exception and its bases, or None if it is
+    unknown."""
 
-EXC_TREE = traverse_exception(BaseException)
-ALL_EXCS = EXC_TREE.keys()
+    bases = db["general"]["user_exceptions"].get(name)
+    if bases is None:
+        bases = EXC_TREE.get(name)
+    return bases
 
 
 @Inspector.register(ast.ClassDef)
 def exception_defs(node, db):
-    exc_bases = tuple(
-        EXC_TREE[base.id] for base in node.bases if name_check(base, *ALL_EXCS)
-    )
+    exc_bases = [
+        get_exception(base.id, db)
+        for base in node.bases
+        if isinstance(base, ast.Name)
+    ]
+    exc_bases = [bases for bases in exc_bases if bases is not None]
     if exc_bases:
-        EXC_TREE[node.name] = exc_bases
-        db["general"]["user_exceptions"][node.name] = exc_bases
+        db["general"]["user_exceptions"][node.name] = tuple(
+            dict.fromkeys((node.name, *chain.from_iterable(exc_bases)))
+        )
 
 
 @Inspector.register(ast.Try)
@@ -116,7 +131,7 @@ def unreachable_except(node, db):
 
     seen = set()
     for handler in handlers:
-        bases = EXC_TREE.get(handler)
+        bases = get_exception(handler, db)
         if bases is None:
             return False
 
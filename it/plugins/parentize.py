@@ -1,39 +1,146 @@
 """
 ## Parentize
-`parent` field to each node
+Parent index of the inspected tree
 
-- `parent_to(child, node)` => yields all parents of child until it reaches `node`
+- `get_index(db)` => the `ParentIndex` of the inspected tree (built on the first use, freed when the inspection ends)
+- `get_parent(node, db)` => parent of the given node (`None` for the root)
+- `parent_to(child, node, db)` => yields all parents of child until it reaches `node`
+- `nearest_ancestor(node, node_types, db)` => closest parent which is an instance of `node_types`
 """
+
 import ast
-import weakref
+from array import array
 
 from it.inspector import Inspector
 from it.utils import Events
 
 __author__ = "Batuhan Taskaya"
-WEAK = False
 
 
-@Inspector.on_event(Events.TREE_TRANSFORMER)
-def parentize(tree, db):
-    for parent in ast.walk(tree):
-        for children in ast.iter_child_nodes(parent):
-            if WEAK:
-                ref = weakref.ref(parent)
-            else:
-                ref = parent
-            children.parent = ref
-    return tree
+class ParentIndex:
+    """Parents, depths and child positions (the order among the siblings)
+    of nodes, kept in arrays that are indexed by the pre-order position of
+    the nodes (rather than attributes on the nodes themselves, which would
+    create reference cycles).
+
+    Indexes built from the inspector's flattened tree (see
+    `Inspector.prepare`) might lack the pruned subtrees, queries for their
+    nodes are answered with a complete index (built on demand) instead."""
+
+    def __init__(self, nodes, parents):
+        self.nodes = nodes
+        self.parents = array("i", parents)
+        self._indexes = dict(zip(map(id, nodes), range(len(nodes))))
+        self._depths = self._positions = None
+        self._complete = None
+
+    @classmethod
+    def from_tree(cls, tree):
+        nodes, parents = [], []
+        stack = [(tree, -1)]
+        while stack:
+            node, parent_index = stack.pop()
+            nodes.append(node)
+            parents.append(parent_index)
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            stack.extend((child, len(nodes) - 1) for child in children)
+
+        index = cls(nodes, parents)
+        index._complete = index
+        return index
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _compute_levels(self):
+        depths = array("i", [0]) * len(self.nodes)
+        positions = array("i", [0]) * len(self.nodes)
+        children = array("i", [0]) * len(self.nodes)
+        for index, parent_index in enumerate(self.parents):
+            if parent_index != -1:
+                depths[index] = depths[parent_index] + 1
+                positions[index] = children[parent_index]
+                children[parent_index] += 1
+        self._depths, self._positions = depths, positions
+
+    @property
+    def depths(self):
+        if self._depths is None:
+            self._compute_levels()
+        return self._depths
+
+    @property
+    def positions(self):
+        if self._positions is None:
+            self._compute_levels()
+        return self._positions
+
+    def locate(self, node):
+        """Return the index that contains the given node (either this one
+        or the complete one), and the position of the node in it."""
+
+        position = self._indexes.get(id(node))
+        if position is not None:
+            return self, position
+        if self._complete is None and self.nodes:
+            self._complete = ParentIndex.from_tree(self.nodes[0])
+        if self._complete is None or self._complete is self:
+            raise ValueError(
+                "Node should be indexed by `it.plugins.parentize`"
+            )
+        return self._complete.locate(node)
 
+    def parent(self, node):
+        index, position = self.locate(node)
+        parent_index = index.parents[position]
+        if parent_index == -1:
+            return None
+        return index.nodes[parent_index]
 
-def parent_to(child, parent):
-    if not hasattr(child, "parent"):
-        raise ValueError(
-            "Node should have `parent` reference created by `it.plugins.parentize`"
-        )
+    def depth(self, node):
+        index, position = self.locate(node)
+        return index.depths[position]
 
-    current = child.parent
-    while current is not parent:
+    def position(self, node):
+        index, position = self.locate(node)
+        return index.positions[position]
+
+    def ancestors(self, node):
+        index, position = self.locate(node)
+        parent_index = index.parents[position]
+        while parent_index != -1:
+            yield index.nodes[parent_index]
+            parent_index = index.parents[parent_index]
+
+
+@Inspector.on_event(Events.FINAL)
+def free_parents(db):
+    db["parentize"].clear()
+
+
+def get_index(db):
+    index = db["parentize"].get("index")
+    if index is None:
+        nodes, _, _, parents = db["inspector"]["flattened"]
+        index = db["parentize"]["index"] = ParentIndex(nodes, parents)
+    return index
+
+
+def get_parent(node, db):
+    return get_index(db).parent(node)
+
+
+def parent_to(child, parent, db):
+    for current in get_index(db).ancestors(child):
         yield current
-        current = current.parent
-    yield parent
+        if current is parent:
+            return
+    raise ValueError(f"{parent!r} isn't a parent of {child!r}")
+
+
+def nearest_ancestor(node, node_types, db):
+    for parent in get_index(db).ancestors(node):
+        if isinstance(parent, node_types):
+            return parent
+    return None
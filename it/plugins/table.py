@@ -0,0 +1,253 @@
+"""
+## Table
+Flattened (struct of arrays) representation of the inspected tree, for
+bulk node queries
+
+- `get_table(db)` => the `NodeTable` of the inspected tree (built on the first use, freed when the inspection ends)
+- `find_nodes(node, node_types, db)` => yields all nodes of the given types in the subtree of `node` (in pre-order)
+- `count_nodes(node, node_types, db)` => number of the nodes `find_nodes` would yield
+"""
+
+__author__ = "Batuhan Taskaya"
+
+import ast
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from heapq import merge
+from itertools import compress
+from operator import itemgetter, not_
+
+from it.inspector import Inspector, _node_types, _reachable_types
+from it.utils import Events
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+TYPE_CODES = {
+    node_type: code
+    for code, node_type in enumerate((ast.AST, *_node_types()))
+}
+
+
+def _type_code(node_type):
+    code = TYPE_CODES.get(node_type)
+    if code is None:
+        # node types that are created after the import
+        code = TYPE_CODES[node_type] = len(TYPE_CODES)
+        _type_codes.cache_clear()
+        _reachable_codes.cache_clear()
+    return code
+
+
+@lru_cache(256)
+def _type_codes(node_types):
+    return frozenset(
+        code
+        for node_type, code in TYPE_CODES.items()
+        if issubclass(node_type, node_types)
+    )
+
+
+@lru_cache(None)
+def _reachable_codes(code):
+    node_type = next(
+        node_type for node_type, other in TYPE_CODES.items() if other == code
+    )
+    return frozenset(
+        map(_type_code, _reachable_types().get(node_type, frozenset()))
+    )
+
+
+class NodeTable:
+    """Pre-order flattened tree, with parallel arrays of node type codes
+    (see `TYPE_CODES`), parent indexes, (exclusive) subtree end indexes,
+    line numbers and column offsets. Positions of each node type are kept
+    sorted, so all nodes of a type within a subtree are a range of them
+    (found with a binary search). Arrays are numpy arrays (sharing the same
+    memory) if it is available.
+
+    Tables built from the inspector's flattened tree (see
+    `Inspector.prepare`) might lack the pruned subtrees, queries for the
+    node types that might be in them are answered with a complete table
+    (built on demand) instead."""
+
+    def __init__(self, nodes, parents, ends, pruned=()):
+        self.nodes = nodes
+        self._indexes = dict(zip(map(id, nodes), range(len(nodes))))
+        try:
+            types = array("H", map(TYPE_CODES.__getitem__, map(type, nodes)))
+        except KeyError:
+            types = array("H", map(_type_code, map(type, nodes)))
+        parents, ends = array("i", parents), array("i", ends)
+        if numpy is not None:
+            types = numpy.frombuffer(types, dtype=numpy.uint16)
+            parents = numpy.frombuffer(parents, dtype=numpy.intc)
+            ends = numpy.frombuffer(ends, dtype=numpy.intc)
+
+        self.types = types
+        self.parents = parents
+        self.ends = ends
+        self._pruned = pruned
+        self._hidden = None
+        self._complete = None
+        self._positions = {}
+        self._linenos = self._columns = None
+
+    @classmethod
+    def from_tree(cls, tree):
+        nodes, parents = [], []
+        stack = [(tree, -1)]
+        while stack:
+            node, parent = stack.pop()
+            index = len(nodes)
+            nodes.append(node)
+            parents.append(parent)
+
+            children = []
+            for field in node._fields:
+                value = getattr(node, field, None)
+                if isinstance(value, ast.AST):
+                    children.append((value, index))
+                elif isinstance(value, list):
+                    children.extend(
+                        (item, index)
+                        for item in value
+                        if isinstance(item, ast.AST)
+                    )
+            children.reverse()
+            stack.extend(children)
+
+        ends = list(range(1, len(nodes) + 1))
+        for index in range(len(nodes) - 1, 0, -1):
+            parent = parents[index]
+            if ends[index] > ends[parent]:
+                ends[parent] = ends[index]
+        return cls(nodes, parents, ends)
+
+    @classmethod
+    def from_flattened(cls, nodes, entries, ends, parents):
+        pruned = list(
+            compress(range(len(nodes)), map(not_, map(itemgetter(3), entries)))
+        )
+        return cls(nodes, parents, ends, pruned)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def linenos(self):
+        if self._linenos is None:
+            self._linenos = self._attributes("lineno")
+        return self._linenos
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = self._attributes("col_offset")
+        return self._columns
+
+    def _attributes(self, name):
+        values = array(
+            "i", (getattr(node, name, 0) or 0 for node in self.nodes)
+        )
+        if numpy is not None:
+            values = numpy.frombuffer(values, dtype=numpy.intc)
+        return values
+
+    def index(self, node):
+        try:
+            return self._indexes[id(node)]
+        except KeyError:
+            raise ValueError(
+                "Node should be a part of the tree of the table"
+            ) from None
+
+    def positions(self, code):
+        """Sorted positions of the nodes with the given type code."""
+
+        if code not in self._positions:
+            if numpy is not None:
+                positions = numpy.flatnonzero(self.types == code)
+            else:
+                positions = array(
+                    "i",
+                    compress(
+                        range(len(self.types)), map(code.__eq__, self.types)
+                    ),
+                )
+            self._positions[code] = positions
+        return self._positions[code]
+
+    def _table_for(self, codes):
+        if self._hidden is None:
+            self._hidden = frozenset().union(
+                *map(
+                    _reachable_codes,
+                    set(map(int, map(self.types.__getitem__, self._pruned))),
+                )
+            )
+        if self._hidden.isdisjoint(codes):
+            return self
+        if self._complete is None:
+            self._complete = NodeTable.from_tree(self.nodes[0])
+        return self._complete
+
+    def _ranges(self, node, node_types):
+        if not isinstance(node_types, tuple):
+            node_types = (node_types,)
+        codes = _type_codes(node_types)
+        table = self._table_for(codes)
+
+        start = table.index(node)
+        end = int(table.ends[start])
+        for code in codes:
+            positions = table.positions(code)
+            if numpy is not None:
+                low, high = positions.searchsorted((start, end))
+            else:
+                low = bisect_left(positions, start)
+                high = bisect_left(positions, end, low)
+            if low < high:
+                yield table, positions[low:high]
+
+    def find(self, node, node_types):
+        """Yield nodes of the given types (including the subclasses) in
+        the subtree of the given node (including itself), in pre-order."""
+
+        ranges = list(self._ranges(node, node_types))
+        if not ranges:
+            return
+        table = ranges[0][0]
+        for position in merge(*(positions for _, positions in ranges)):
+            yield table.nodes[position]
+
+    def count(self, node, node_types):
+        return sum(
+            len(positions) for _, positions in self._ranges(node, node_types)
+        )
+
+
+@Inspector.on_event(Events.FINAL)
+def free_table(db):
+    db["table"].clear()
+
+
+def get_table(db):
+    table = db["table"].get("table")
+    if table is None:
+        table = db["table"]["table"] = NodeTable.from_flattened(
+            *db["inspector"]["flattened"]
+        )
+    return table
+
+
+def find_nodes(node, node_types, db):
+    return get_table(db).find(node, node_types)
+
+
+def count_nodes(node, node_types, db):
+    return get_table(db).count(node, node_types)
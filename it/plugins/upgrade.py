@@ -10,8 +10,10 @@ import ast
 import string
 
 from it.inspector import Inspector
+from it.pattern import ANY, items, length, name, not_, pattern
 from it.plugin import Plugin
 from it.plugins.context import Contexts, get_context
+from it.plugins.table import find_nodes
 from it.utils import (
     PY39_PLUS,
     biname_check,
@@ -36,23 +38,20 @@ def yield_from(node, db):
         return node.body[0].value
 
 
-@Inspector.register(ast.Subscript)
+_PAIR = pattern(ast.Tuple, elts=length(2))
+
+
+@Inspector.register(
+    pattern(
+        ast.Subscript,
+        value=name("Union"),
+        slice=_PAIR if PY39_PLUS else pattern(ast.Index, value=_PAIR),
+    )
+)
 def optional(node, db):
     """`Union[Type, None]` can be replaced with `Optional[Type]`."""
 
-    if (
-        name_check(node.value, "Union")
-        and isinstance(get_slice(node), ast.Tuple)
-        and len(get_slice(node).elts) == 2
-        and len(
-            list(
-                filter(
-                    lambda node: constant_check(node, None),
-                    get_slice(node).elts,
-                )
-            )
-        )
-    ):
+    if any(constant_check(elt, None) for elt in get_slice(node).elts):
         return node.value
 
 
@@ -70,63 +69,71 @@ def super_args(node, db):
     )
 
 
-@Inspector.register(ast.For)
+@Inspector.register(
+    pattern(
+        ast.For,
+        iter=pattern(
+            ast.Call,
+            func=name("range"),
+            args=items(pattern(ast.Call, func=name("len"), args=items(ANY))),
+        ),
+    )
+)
+@Plugin.require("@table")
 def builtin_enumerate(node, db):
     """`range(len(iterable))` can be replaced with `enumerate(iterable)`"""
 
-    if (
-        isinstance(node.iter, ast.Call)
-        and name_check(node.iter.func, "range")
-        and len(node.iter.args) == 1
-        and isinstance(node.iter.args[0], ast.Call)
-        and name_check(node.iter.args[0].func, "len")
-        and len(node.iter.args[0].args) == 1
-    ):
-        target = node.target
-        iterable = node.iter.args[0].args[0]
-        for subnode in ast.walk(node):
-            if (
-                isinstance(subnode, ast.Subscript)
-                and isinstance(subnode.ctx, ast.Load)
-                and version_bound_check(subnode.slice, "Index", PY39_PLUS)
-                and biname_check(subnode.value, iterable)
-                and biname_check(get_slice(subnode), target)
-            ):
-                return node.iter
-
-
-@Inspector.register(ast.Call)
+    target = node.target
+    iterable = node.iter.args[0].args[0]
+    for subnode in find_nodes(node, ast.Subscript, db):
+        if (
+            isinstance(subnode.ctx, ast.Load)
+            and version_bound_check(subnode.slice, "Index", PY39_PLUS)
+            and biname_check(subnode.value, iterable)
+            and biname_check(get_slice(subnode), target)
+        ):
+            return node.iter
+
+
+@Inspector.register(
+    pattern(
+        ast.Call,
+        func=name("list", "set"),
+        args=items(ast.GeneratorExp),
+        keywords=length(0),
+    ),
+    pattern(
+        ast.Call,
+        func=name("dict"),
+        args=items(pattern(ast.GeneratorExp, elt=_PAIR)),
+        keywords=length(0),
+    ),
+)
 def use_comprehension(node, db):
     """`list`/`dict`/`set` calls with a generator expression
     can be replaced with comprehensions."""
 
-    if (
-        name_check(node.func, "list", "set", "dict")
-        and len(node.args) == 1
-        and len(node.keywords) == 0
-        and isinstance(node.args[0], ast.GeneratorExp)
-    ):
-        if not name_check(node.func, "dict"):
-            return True
-        return (
-            isinstance(node.args[0].elt, ast.Tuple)
-            and len(node.args[0].elt.elts) == 2
-        )
+    return True
 
 
-@Inspector.register(ast.Call)
+@Inspector.register(
+    pattern(
+        ast.Call,
+        func=name("list", "set"),
+        args=items(
+            pattern(
+                ast.Call,
+                func=name("map"),
+                args=items(not_((ast.Name, ast.Attribute)), ANY),
+            )
+        ),
+    )
+)
 def map_use_comprehension(node, db):
     """A map (to a complex callable) can be replaced with 
     `list` or `set` comprehensions."""
 
-    return (
-        name_check(node.func, "list", "set")
-        and len(node.args) == 1
-        and isinstance(node.args[0], ast.Call)
-        and name_check(node.args[0].func, "map")
-        and len(node.args[0].args) == 2
-        and not isinstance(node.args[0].args[0], (ast.Name, ast.Attribute))
-    )
+    return True
 
 
 @Inspector.register(ast.Assign)
@@ -0,0 +1,157 @@
+"""Cumulative timing of the inspection hooks."""
+
+from collections import defaultdict
+from functools import wraps
+from time import perf_counter
+
+CALLS, HITS, SECONDS, MAX = range(4)
+
+
+def _stats():
+    return [0, 0, 0.0, 0.0]
+
+
+def hook_name(hook):
+    plugin = getattr(hook, "plugin", "unknown")
+    return str(getattr(plugin, "plugin", plugin)), hook.__name__
+
+
+class Profile:
+    """Cumulative `[calls, hits, seconds, max seconds]` stats of the hooks
+    (keyed by `(plugin, hook)` pairs) and of the node types (the time spent
+    in the hooks of that node type). A hit is a call with a truthy result
+    (a report, for the node hooks)."""
+
+    def __init__(self, hooks=None, node_types=None):
+        self.hooks = defaultdict(_stats)
+        self.node_types = defaultdict(_stats)
+        self._instrumented = {}
+        self._tables = {}
+        self.merge(hooks or {}, node_types or {})
+
+    def __getstate__(self):
+        return {"hooks": dict(self.hooks), "node_types": dict(self.node_types)}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def merge(self, hooks, node_types=None):
+        if isinstance(hooks, Profile):
+            hooks, node_types = hooks.hooks, hooks.node_types
+
+        for stats, other in (
+            (self.hooks, hooks),
+            (self.node_types, node_types or {}),
+        ):
+            for key, (calls, hits, seconds, max_seconds) in other.items():
+                current = stats[key]
+                current[CALLS] += calls
+                current[HITS] += hits
+                current[SECONDS] += seconds
+                current[MAX] = max(current[MAX], max_seconds)
+
+    def timed(self, hook, node_type=None):
+        counters = [self.hooks[hook_name(hook)]]
+        if node_type is not None:
+            counters.append(self.node_types[node_type.__name__])
+
+        @wraps(hook)
+        def timed_hook(*args):
+            started = perf_counter()
+            try:
+                result = hook(*args)
+            finally:
+                elapsed = perf_counter() - started
+                for stats in counters:
+                    stats[CALLS] += 1
+                    stats[SECONDS] += elapsed
+                    if elapsed > stats[MAX]:
+                        stats[MAX] = elapsed
+            if result:
+                for stats in counters:
+                    stats[HITS] += 1
+            return result
+
+        return timed_hook
+
+    def instrument_hooks(self, hooks, node_type=None):
+        key = node_type, tuple(hooks)
+        if key not in self._instrumented:
+            self._instrumented[key] = tuple(
+                self.timed(hook, node_type) for hook in hooks
+            )
+        return self._instrumented[key]
+
+    def instrument(self, table):
+        """Wrap all hooks of the given dispatch table (see
+        `compile_dispatch`) with timers."""
+
+        if id(table) not in self._tables:
+            instrumented = {
+                node_type: (
+                    *(
+                        self.instrument_hooks(hooks, node_type)
+                        for hooks in entry[:3]
+                    ),
+                    entry[3],
+                )
+                for node_type, entry in table.items()
+            }
+            # keep a reference to the table, so that the id stays unique
+            self._tables[id(table)] = table, instrumented
+        return self._tables[id(table)][1]
+
+    def as_dict(self):
+        def rows(stats, *names):
+            return [
+                {
+                    **dict(
+                        zip(names, key if isinstance(key, tuple) else (key,))
+                    ),
+                    "calls": calls,
+                    "hits": hits,
+                    "seconds": seconds,
+                    "max_seconds": max_seconds,
+                }
+                for key, (calls, hits, seconds, max_seconds) in sorted(
+                    stats.items(), key=lambda item: -item[1][SECONDS]
+                )
+            ]
+
+        return {
+            "hooks": rows(self.hooks, "plugin", "hook"),
+            "node_types": rows(self.node_types, "node_type"),
+        }
+
+    def format_table(self, limit=None):
+        """Render hook and node type stats as tables, the most expensive
+        ones first."""
+
+        lines = []
+        for title, stats in (
+            ("hook", self.hooks),
+            ("node type", self.node_types),
+        ):
+            rows = sorted(
+                (item for item in stats.items() if item[1][CALLS]),
+                key=lambda item: -item[1][SECONDS],
+            )[:limit]
+            names = [
+                ".".join(key) if isinstance(key, tuple) else key
+                for key, _ in rows
+            ]
+            width = max(map(len, [title, *names]))
+            lines.append(
+                f"{title:<{width}}  {'calls':>9}  {'hits':>7}  "
+                f"{'total ms':>10}  {'mean us':>9}  {'max us':>9}"
+            )
+            for name, (_, (calls, hits, seconds, max_seconds)) in zip(
+                names, rows
+            ):
+                lines.append(
+                    f"{name:<{width}}  {calls:>9}  {hits:>7}  "
+                    f"{seconds * 1e3:>10.2f}  {seconds / calls * 1e6:>9.2f}  "
+                    f"{max_seconds * 1e6:>9.2f}"
+                )
+            lines.append("")
+        return "\n".join(lines)
@@ -1,14 +1,194 @@
+import csv
+import json
+import struct
+from array import array
+from collections import defaultdict
 from dataclasses import dataclass
 
+# rows, size of the string table
+_HEADER = struct.Struct("<II")
+_COLUMNS = ("plugins", "codes", "linenos", "columns")
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
 
 @dataclass
 class Report:
+    __slots__ = ("code", "column", "lineno", "filename")
+
     code: str
     column: int
     lineno: int
     filename: str
 
 
+class ReportBatch:
+    """Reports of a single file, in a columnar form. Plugin names and
+    codes are interned into a string table (`strings`) and the rows are
+    kept in integer columns, which can be cheaply converted to bytes."""
+
+    __slots__ = ("filename", "strings") + _COLUMNS
+
+    def __init__(
+        self,
+        filename,
+        strings=(),
+        plugins=(),
+        codes=(),
+        linenos=(),
+        columns=(),
+    ):
+        self.filename = filename
+        self.strings = list(strings)
+        self.plugins = array("i", plugins)
+        self.codes = array("i", codes)
+        self.linenos = array("i", linenos)
+        self.columns = array("i", columns)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        """Yield `(plugin, code, lineno, column)` rows."""
+        strings = self.strings
+        for plugin, code, lineno, column in zip(
+            self.plugins, self.codes, self.linenos, self.columns
+        ):
+            yield strings[plugin], strings[code], lineno, column
+
+    def __eq__(self, other):
+        if not isinstance(other, ReportBatch):
+            return NotImplemented
+        return self.filename == other.filename and list(self) == list(other)
+
+    def __repr__(self):
+        return f"ReportBatch(filename={self.filename!r}, rows={len(self)})"
+
+    @classmethod
+    def from_inspection(cls, filename, inspection):
+        batch = cls(filename)
+        interned = {}
+
+        def intern(string):
+            if string not in interned:
+                interned[string] = len(batch.strings)
+                batch.strings.append(string)
+            return interned[string]
+
+        for plugin, reports in inspection.items():
+            plugin = intern(plugin)
+            for report in reports:
+                batch.plugins.append(plugin)
+                batch.codes.append(intern(report.code))
+                batch.linenos.append(report.lineno)
+                batch.columns.append(report.column)
+        return batch
+
+    def to_inspection(self):
+        inspection = defaultdict(list)
+        for plugin, code, lineno, column in self:
+            inspection[plugin].append(
+                Report(code, column, lineno, self.filename)
+            )
+        return inspection
+
+    def take(self, rows):
+        """A new batch of the rows at the given indexes."""
+        return ReportBatch(
+            self.filename,
+            self.strings,
+            *(
+                [getattr(self, column)[index] for index in rows]
+                for column in _COLUMNS
+            ),
+        )
+
+    def filter(self, predicate):
+        """A new batch of the rows (`(plugin, code, lineno, column)`)
+        that satisfy the predicate."""
+        return self.take(
+            [index for index, row in enumerate(self) if predicate(*row)]
+        )
+
+    def without_codes(self, codes):
+        """The batch without the rows of the given codes (the batch itself
+        if it has none of them)."""
+        ignored = {
+            index
+            for index, string in enumerate(self.strings)
+            if string in codes
+        }
+        if ignored.isdisjoint(self.codes):
+            return self
+        return self.take(
+            [
+                index
+                for index, code in enumerate(self.codes)
+                if code not in ignored
+            ]
+        )
+
+    def group(self, column):
+        """Split the batch into `{value: batch}` by the values of one of
+        its columns (plugins and codes are resolved to their names)."""
+        rows = defaultdict(list)
+        for index, value in enumerate(getattr(self, column)):
+            rows[value].append(index)
+        if column in ("plugins", "codes"):
+            return {
+                self.strings[value]: self.take(indexes)
+                for value, indexes in rows.items()
+            }
+        return {value: self.take(indexes) for value, indexes in rows.items()}
+
+    def to_dicts(self, with_plugin=False):
+        """Report dicts of the rows, for the serialized (JSON) results."""
+        return [
+            {
+                **({"plugin": plugin} if with_plugin else {}),
+                "code": code,
+                "column": column,
+                "lineno": lineno,
+                "filename": self.filename,
+            }
+            for plugin, code, lineno, column in self
+        ]
+
+    def by_plugin(self):
+        """Group `(code, lineno, column)` rows by their plugins."""
+        grouped = defaultdict(list)
+        for plugin, *row in self:
+            grouped[plugin].append(row)
+        return grouped
+
+    def to_bytes(self):
+        strings = "\0".join([self.filename, *self.strings]).encode()
+        return b"".join(
+            [
+                _HEADER.pack(len(self), len(strings)),
+                strings,
+                *(getattr(self, column).tobytes() for column in _COLUMNS),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, payload):
+        rows, size = _HEADER.unpack_from(payload)
+        offset = _HEADER.size + size
+        filename, *strings = (
+            payload[_HEADER.size : offset].decode().split("\0")
+        )
+
+        columns = []
+        for _ in _COLUMNS:
+            column = array("i")
+            end = offset + rows * column.itemsize
+            column.frombytes(payload[offset:end])
+            columns.append(column)
+            offset = end
+        return cls(filename, strings, *columns)
+
+
 def _prepare_result(all_reports, indent_with=2):
     """
     [PLUGIN]
@@ -24,17 +204,171 @@ def _prepare_result(all_reports, indent_with=2):
     [unreachable_except]
       - ../t.py:5:2     => UNREACHABLE_EXCEPT
     """
-    buffer = ""
+    if isinstance(all_reports, ReportBatch):
+        lines = _iter_batch_result(all_reports, indent_with)
+    else:
+        lines = _iter_result(all_reports, indent_with)
+    return "".join(lines)
+
+
+def _format_report(filename, lineno, column, code, indent_with):
+    position = f"{lineno}:{column}"
+    return (
+        f"{' ' * indent_with}- {filename}:{position}"
+        f"{' ' * (8 - len(position))}=> {code}\n"
+    )
+
+
+def _iter_result(all_reports, indent_with=2):
     for plugin, reports in all_reports.items():
-        buffer += f"[{plugin}]\n"
+        yield f"[{plugin}]\n"
         for report in reports:
-            buffer += " " * indent_with
-            buffer += (
-                f"- {report['filename']}:{report['lineno']}:{report['column']}"
+            yield _format_report(
+                report["filename"],
+                report["lineno"],
+                report["column"],
+                report["code"],
+                indent_with,
             )
-            buffer += " " * (
-                8
-                - (len(str(report["lineno"])) + len(str(report["column"])) + 1)
+
+
+def _iter_batch_result(batch, indent_with=2):
+    for plugin, rows in batch.by_plugin().items():
+        yield f"[{plugin}]\n"
+        for code, lineno, column in rows:
+            yield _format_report(
+                batch.filename, lineno, column, code, indent_with
             )
-            buffer += f"=> {report['code']}\n"
-    return buffer
+
+
+class Reporter:
+    """Write reports to `stream` as they are produced. Subclasses are
+    registered under their `format` name (see `Reporter.formats`)."""
+
+    formats = {}
+
+    def __init_subclass__(cls, format=None, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if format is not None:
+            Reporter.formats[format] = cls
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.finish()
+        self.stream.flush()
+
+    def start(self):
+        pass
+
+    def finish(self):
+        pass
+
+    def write(self, plugin, code, filename, lineno, column):
+        raise NotImplementedError
+
+    def write_reports(self, reports):
+        """Write either a `ReportBatch` or a mapping of plugin names
+        to report dicts (see `Session.merge_inspections`)."""
+        if isinstance(reports, ReportBatch):
+            for plugin, code, lineno, column in reports:
+                self.write(plugin, code, reports.filename, lineno, column)
+        else:
+            for plugin, plugin_reports in reports.items():
+                for report in plugin_reports:
+                    self.write(
+                        plugin,
+                        report["code"],
+                        report["filename"],
+                        report["lineno"],
+                        report["column"],
+                    )
+        self.stream.flush()
+
+
+class TextReporter(Reporter, format="text"):
+    def write_reports(self, reports):
+        if reports:
+            self.stream.write(_prepare_result(reports))
+            self.stream.flush()
+
+
+class JSONLReporter(Reporter, format="jsonl"):
+    def write(self, plugin, code, filename, lineno, column):
+        json.dump(
+            {
+                "plugin": plugin,
+                "code": code,
+                "filename": filename,
+                "lineno": lineno,
+                "column": column,
+            },
+            self.stream,
+        )
+        self.stream.write("\n")
+
+
+class CSVReporter(Reporter, format="csv"):
+    def start(self):
+        self.writer = csv.writer(self.stream)
+        self.writer.writerow(
+            ("plugin", "code", "filename", "lineno", "column")
+        )
+
+    def write(self, plugin, code, filename, lineno, column):
+        self.writer.writerow((plugin, code, filename, lineno, column))
+
+
+class SARIFReporter(Reporter, format="sarif"):
+    """Streams a single SARIF run; results are written one by one and the
+    rules (which are only known at the end) are placed after them."""
+
+    def start(self):
+        self.rules = {}
+        self.results = 0
+        self.stream.write(
+            f'{{"version": "2.1.0", "$schema": "{SARIF_SCHEMA}", '
+            '"runs": [{"results": ['
+        )
+
+    def write(self, plugin, code, filename, lineno, column):
+        if self.results:
+            self.stream.write(", ")
+        self.results += 1
+        self.rules.setdefault(code, plugin)
+        result = {
+            "ruleId": code,
+            "level": "warning",
+            "message": {"text": code},
+            "locations": [
+                {
+                    "physicalLocation": {
+                        "artifactLocation": {"uri": filename},
+                        "region": {
+                            "startLine": max(lineno, 1),
+                            "startColumn": column + 1,
+                        },
+                    }
+                }
+            ],
+            "properties": {"plugin": plugin},
+        }
+        json.dump(result, self.stream)
+
+    def finish(self):
+        driver = {
+            "name": "InspectorTiger",
+            "informationUri": "https://github.com/thg-consulting/it",
+            "rules": [
+                {"id": code, "properties": {"plugin": plugin}}
+                for code, plugin in self.rules.items()
+            ],
+        }
+        self.stream.write(
+            '], "tool": {"driver": ' + json.dumps(driver) + "}}]}\n"
+        )
@@ -1,14 +1,12 @@
 import argparse
-import socketserver
+import asyncio
+from multiprocessing import cpu_count
 
 from it.server import InspectorServer
+from it.server.handler import CACHE_ENTRIES, CACHE_SIZE, PROFILE_EVERY
+from it.session import Session
 from it.utils import logger, prepare_logger
 
-
-class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-    pass
-
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="it.server | Inspector Tiger Web API"
@@ -21,19 +19,46 @@ if __name__ == "__main__":
         "-P", "--port", help="Server port", default=8000, type=int
     )
     parser.add_argument(
-        "-T",
-        "--threaded",
-        help="Run server in threaded mode",
-        action="store_true",
-        default=False,
+        "-W",
+        "--workers",
+        help="Number of inspection worker processes",
+        default=cpu_count(),
+        type=int,
+    )
+
+    parser.add_argument(
+        "--cache-entries",
+        help="Maximum number of cached results (0 disables the cache)",
+        default=CACHE_ENTRIES,
+        type=int,
+    )
+    parser.add_argument(
+        "--cache-size",
+        help="Maximum total size of cached results, in bytes",
+        default=CACHE_SIZE,
+        type=int,
+    )
+    parser.add_argument(
+        "--profile-every",
+        help="Time the hooks of every nth inspection (0 disables it)",
+        default=PROFILE_EVERY,
+        type=int,
     )
 
     server = parser.parse_args()
     prepare_logger()
-    if server.threaded:
-        runner = ThreadedTCPServer
-    else:
-        runner = socketserver.TCPServer
-    with runner((server.host, server.port), InspectorServer) as httpd:
-        logger.info("Starting server at %s:%s", *httpd.server_address)
-        httpd.serve_forever()
+
+    session = Session()
+    session.start()
+    try:
+        asyncio.run(
+            InspectorServer(
+                session,
+                server.workers,
+                server.cache_entries,
+                server.cache_size,
+                server.profile_every,
+            ).serve(server.host, server.port)
+        )
+    except KeyboardInterrupt:
+        logger.info("Shutting down the server")
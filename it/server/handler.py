@@ -1,63 +1,353 @@
 import ast
+import asyncio
 import json
-from http.server import BaseHTTPRequestHandler
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 
-from it.inspector import Inspector
+from it.cache import MemoryCache, fingerprint
+from it.profile import Profile
+from it.reports import ReportBatch
+from it.server.http import (
+    MAX_LINE_SIZE,
+    HTTPError,
+    Response,
+    read_request,
+    write_response,
+)
+from it.server.metrics import ServerMetrics
 from it.session import Session
 from it.utils import Group, logger
 
+KEEP_ALIVE_TIMEOUT = 15
+PENDING_PER_WORKER = 4
+CACHE_ENTRIES = 1024
+CACHE_SIZE = 64 * 1024 * 1024
+PROFILE_EVERY = 10
 
-class InspectorServer(BaseHTTPRequestHandler):
-    def do_GET(self, *args, **kwargs):
-        self.respond(200, message="use post method")
+DEFAULT_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST",
+    "Cache-Control": "no-store, no-cache, must-revalidate",
+}
 
-    def do_POST(self, *args, **kwargs):
-        content_length = int(self.headers.get("Content-Length", "-1"))
-        body = self.rfile.read(content_length)
-        logger.info("Got this: {}")
+_worker_session = None
+
+
+def _initialize_worker(config):
+    global _worker_session
+    _worker_session = Session(config)
+    _worker_session.start()
+
+
+def _inspect_source(source, filename, profile=False):
+    profile = Profile() if profile else None
+    started = time.perf_counter()
+    tree = ast.parse(source, filename)
+    parsed = time.perf_counter()
+    batch = _worker_session.source_inspection(tree, filename, profile)
+    timings = {
+        "parse": parsed - started,
+        "inspect": time.perf_counter() - parsed,
+    }
+    return batch.to_bytes(), timings, profile and dict(profile.hooks)
+
+
+def _etag_matches(if_none_match, etag):
+    # only the real tags, `*` (any current representation) means nothing
+    # for the results of a POST request
+    if if_none_match is None:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    return etag in tags or f"W/{etag}" in tags
+
+
+def _cache_headers(etag):
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+class InspectorServer:
+    """Inspection API over HTTP/1.1 (with persistent connections). Plugins
+    are loaded once per process and the inspections run on a bounded pool
+    of worker processes, so the event loop is never blocked."""
+
+    def __init__(
+        self,
+        session,
+        workers=None,
+        cache_entries=CACHE_ENTRIES,
+        cache_size=CACHE_SIZE,
+        profile_every=PROFILE_EVERY,
+    ):
+        self.session = session
+        self.metrics = ServerMetrics()
+        # hooks are only timed on every nth inspection, since it is
+        # not cheap enough to do for all of them
+        self.profile_every = profile_every
+        self._inspections = 0
+        self.workers = workers or session.config.workers
+        self.executor = None
+        self._pending = None
+        self.cache = MemoryCache(
+            fingerprint(session.plugins, session.config.blacklist.codes),
+            cache_entries,
+            cache_size,
+        )
+        self.routes = {
+            ("GET", "/"): self.index,
+            ("GET", "/stats"): self.stats,
+            ("GET", "/metrics"): self.export_metrics,
+            ("POST", "/"): self.inspect,
+            ("POST", "/batch"): self.batch,
+        }
+
+    def start(self):
+        self.executor = ProcessPoolExecutor(
+            self.workers,
+            initializer=_initialize_worker,
+            initargs=(self.session.config,),
+        )
+        # at most this many inspections can wait for a worker
+        self._pending = asyncio.Semaphore(self.workers * PENDING_PER_WORKER)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    async def serve(self, host, port):
+        self.start()
+        server = await asyncio.start_server(
+            self.handle_connection, host, port, limit=MAX_LINE_SIZE
+        )
+        logger.info(
+            "Starting server at %s:%s", *server.sockets[0].getsockname()[:2]
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    async def run_inspection(self, source, filename="<unknown>", key=None):
+        if key is None:
+            key = self.cache.key(source.encode())
+
+        payload = self.cache.get(key)
+        if payload is None:
+            self._inspections += 1
+            profile = bool(self.profile_every) and (
+                self._inspections % self.profile_every == 0
+            )
+
+            loop = asyncio.get_running_loop()
+            async with self._pending:
+                self.metrics.inspections_in_flight.inc()
+                try:
+                    payload, timings, hooks = await loop.run_in_executor(
+                        self.executor,
+                        _inspect_source,
+                        source,
+                        filename,
+                        profile,
+                    )
+                except SyntaxError:
+                    self.metrics.parse_failures.inc()
+                    raise
+                finally:
+                    self.metrics.inspections_in_flight.dec()
+
+            for phase, seconds in timings.items():
+                self.metrics.phases.observe(phase, value=seconds)
+            if hooks is not None:
+                self.metrics.observe_profile(hooks)
+            self.cache.set(key, payload)
+
+        batch = ReportBatch.from_bytes(payload)
+        batch.filename = filename
+        return batch
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        read_request(reader), KEEP_ALIVE_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    break
+                except HTTPError as exc:
+                    response = self.fail(exc.message, exc.status)
+                    await write_response(writer, response, keep_alive=False)
+                    break
+
+                if request is None:
+                    break
+
+                await self.handle_request(request, writer)
+                if not request.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request, writer):
+        path = request.path
+        if not any(path == route for _, route in self.routes):
+            path = "unknown"
+
+        self.metrics.requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            response = await self.dispatch(request)
+            await write_response(writer, response, request.keep_alive)
+        finally:
+            self.metrics.requests_in_flight.dec()
+        self.metrics.latency.observe(path, value=time.perf_counter() - started)
+        self.metrics.requests.inc(request.method, path, str(response.status))
+
+    async def dispatch(self, request):
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                response = self.fail("Method not allowed", 405)
+            else:
+                response = self.fail("Not found", 404)
+        else:
+            try:
+                response = await handler(request)
+            except Exception:
+                logger.exception("Couldn't handle the request")
+                response = self.fail("Internal server error", 500)
+
+        for header, value in DEFAULT_HEADERS.items():
+            response.headers.setdefault(header, value)
+        return response
+
+    async def index(self, request):
+        return self.respond(message="use post method")
+
+    async def stats(self, request):
+        return self.respond(cache=self.cache.stats())
+
+    async def export_metrics(self, request):
+        self.metrics.observe_cache(self.cache)
+        return Response(
+            200,
+            self.metrics.render().encode(),
+            {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def inspect(self, request):
         try:
-            body = json.loads(body.decode())
-        except json.JSONDecodeError:
+            body = request.json()
+        except ValueError:
             logger.exception("Couldn't parse body")
             return self.fail("Request body should be JSON!")
 
-        source = body.get("source")
+        source = body.get("source") if isinstance(body, dict) else None
         if source is None:
-            logger.exception("Missing body item")
+            logger.error("Missing body item")
             return self.fail("Request body should contain a source field!")
 
         try:
-            source = ast.parse(source)
+            if not isinstance(source, str):
+                raise TypeError(f"source should be a string, not {source!r}")
+            # same source, same plugins => same result
+            key = self.cache.key(source.encode())
+            etag = f'"{key}"'
+            if _etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(304, headers=_cache_headers(etag))
+            batch = await self.run_inspection(source, key=key)
         except (SyntaxError, TypeError) as exc:
             logger.exception("Couldn't parse source")
             return self.fail(
                 message=f"Couldn't parse the source code. {exc!r}"
             )
 
-        session = Session()
-        session.start()
+        with self.measure("serialize"):
+            response = self.respond(
+                status="success",
+                result=dict(self.session.group_by(batch, group=Group.LINENO)),
+            )
+        response.headers.update(_cache_headers(etag))
+        return response
+
+    async def batch(self, request):
+        """Inspect many `{"filename": ..., "source": ...}` items at once.
+        Results are streamed back as newline delimited JSON, one line for
+        each file in the order of completion."""
 
-        inspection = session.single_inspection(source)
-        return self.respond(
-            status="success",
-            result=dict(session.group_by(inspection, group=Group.LINENO)),
+        try:
+            body = request.json()
+        except ValueError:
+            logger.exception("Couldn't parse body")
+            return self.fail("Request body should be JSON!")
+
+        items = body.get("items") if isinstance(body, dict) else body
+        if not isinstance(items, list) or not all(
+            isinstance(item, dict)
+            and isinstance(item.get("filename"), str)
+            and isinstance(item.get("source"), str)
+            for item in items
+        ):
+            return self.fail(
+                "Request body should contain a list of items with "
+                "filename and source fields!"
+            )
+
+        return Response(
+            200,
+            self._stream_batch(items),
+            {"Content-Type": "application/x-ndjson"},
         )
 
-    def _respond(self, code):
-        self.send_response(code)
-        self.end_headers()
+    async def _stream_batch(self, items):
+        async def inspect(item):
+            try:
+                batch = await self.run_inspection(
+                    item["source"], item["filename"]
+                )
+            except SyntaxError as exc:
+                message = f"Couldn't parse the source code. {exc!r}"
+            except Exception:
+                logger.exception(f"Couldn't inspect {item['filename']}")
+                message = "Couldn't inspect the source code."
+            else:
+                message = None
+
+            if message is not None:
+                return {
+                    "filename": item["filename"],
+                    "status": "fail",
+                    "message": message,
+                }
+            return {
+                "filename": item["filename"],
+                "status": "success",
+                "result": self.session.merge_inspections([batch]),
+            }
+
+        tasks = [asyncio.ensure_future(inspect(item)) for item in items]
+        try:
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                with self.measure("serialize"):
+                    line = json.dumps(result).encode() + b"\n"
+                yield line
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @contextmanager
+    def measure(self, phase):
+        started = time.perf_counter()
+        yield
+        self.metrics.phases.observe(phase, value=time.perf_counter() - started)
 
     def respond(self, code=200, **data):
-        self._respond(code)
-        self.wfile.write(json.dumps(data).encode())
+        return Response.from_json(code, **data)
 
     def fail(self, message, code=400):
-        self.respond(code=code, status="fail", message=message)
-
-    def end_headers(self):
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET")
-        self.send_header(
-            "Cache-Control", "no-store, no-cache, must-revalidate"
-        )
-        return super().end_headers()
+        return self.respond(code=code, status="fail", message=message)
@@ -0,0 +1,142 @@
+"""A minimal HTTP/1.1 implementation (on top of asyncio streams) with
+persistent connections and chunked responses."""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+MAX_HEADERS = 100
+MAX_LINE_SIZE = 8 * 1024
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+        self.message = message or HTTPStatus(status).phrase
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    version: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self):
+        return json.loads(self.body.decode())
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: Any = b""
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_json(cls, code=200, **data):
+        return cls(
+            code,
+            json.dumps(data).encode(),
+            {"Content-Type": "application/json"},
+        )
+
+    @property
+    def streamed(self):
+        return not isinstance(self.body, bytes)
+
+
+async def _read_line(reader):
+    # the line size is bounded by the stream's limit (see MAX_LINE_SIZE)
+    try:
+        line = await reader.readuntil(b"\r\n")
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431)
+    return line[:-2].decode("latin-1")
+
+
+async def read_request(reader):
+    """Read the next request from the stream, or return `None` if the
+    client closed the connection."""
+
+    try:
+        request_line = await _read_line(reader)
+    except EOFError:
+        return None
+
+    try:
+        method, target, version = request_line.split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    if version not in {"HTTP/1.0", "HTTP/1.1"}:
+        raise HTTPError(505)
+
+    headers = {}
+    while True:
+        try:
+            line = await _read_line(reader)
+        except EOFError:
+            return None
+        if not line:
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HTTPError(431)
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    body = b""
+    if "transfer-encoding" in headers:
+        raise HTTPError(411)
+    if "content-length" in headers:
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            raise HTTPError(400, "Malformed content length")
+        if length < 0:
+            raise HTTPError(400, "Malformed content length")
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(413)
+        try:
+            body = await reader.readexactly(length)
+        except EOFError:
+            return None
+
+    return Request(method, urlsplit(target).path, version, headers, body)
+
+
+def _head(status, headers):
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def write_response(writer, response, keep_alive=True):
+    headers = response.headers.copy()
+    headers["Connection"] = "keep-alive" if keep_alive else "close"
+    if response.streamed:
+        headers["Transfer-Encoding"] = "chunked"
+        writer.write(_head(response.status, headers))
+        try:
+            async for chunk in response.body:
+                if chunk:
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    await writer.drain()
+        finally:
+            await response.body.aclose()
+        writer.write(b"0\r\n\r\n")
+    else:
+        headers["Content-Length"] = str(len(response.body))
+        writer.write(_head(response.status, headers) + response.body)
+    await writer.drain()
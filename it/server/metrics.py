@@ -0,0 +1,206 @@
+"""Dependency free metrics, rendered in the Prometheus text format."""
+
+from bisect import bisect_left
+from collections import defaultdict
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        + "}"
+    )
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = defaultdict(float)
+        if not self.labels:
+            self.values[()] = 0
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] += amount
+
+    def set(self, *labels, value):
+        self.values[labels] = value
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield self.name + _labels(self.labels, labels), value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        for name, value in self.samples():
+            yield f"{name} {value!r}"
+
+
+class Counter(Metric):
+    type = "counter"
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.values[labels] -= amount
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=None):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS)
+        self.values = defaultdict(self._empty)
+
+    def _empty(self):
+        # counts of each bucket (and +Inf), sum
+        return [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, *labels, value):
+        state = self.values[labels]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def samples(self):
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield self.name + "_bucket" + _labels(
+                    self.labels, labels, le=bound
+                ), cumulative
+            yield self.name + "_sum" + _labels(self.labels, labels), total
+            yield self.name + "_count" + _labels(
+                self.labels, labels
+            ), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class ServerMetrics(Registry):
+    def __init__(self):
+        super().__init__()
+        self.requests = self.counter(
+            "it_requests_total",
+            "Handled HTTP requests.",
+            ("method", "path", "code"),
+        )
+        self.requests_in_flight = self.gauge(
+            "it_requests_in_flight", "HTTP requests being handled."
+        )
+        self.inspections_in_flight = self.gauge(
+            "it_inspections_in_flight", "Inspections running on the workers."
+        )
+        self.parse_failures = self.counter(
+            "it_parse_failures_total", "Sources that couldn't be parsed."
+        )
+        self.latency = self.histogram(
+            "it_request_duration_seconds",
+            "Time spent on handling HTTP requests.",
+            ("path",),
+        )
+        self.phases = self.histogram(
+            "it_phase_duration_seconds",
+            "Time spent on each phase (parse, inspect, serialize).",
+            ("phase",),
+        )
+        self.profiled = self.counter(
+            "it_profiled_inspections_total",
+            "Inspections that were profiled (the hook and plugin times "
+            "are collected from these).",
+        )
+        self.plugin_seconds = self.counter(
+            "it_plugin_seconds_total",
+            "Time spent on the hooks of each plugin.",
+            ("plugin",),
+        )
+        self.hook_seconds = self.counter(
+            "it_hook_seconds_total",
+            "Time spent on each hook.",
+            ("plugin", "hook"),
+        )
+        self.hook_calls = self.counter(
+            "it_hook_calls_total", "Calls of each hook.", ("plugin", "hook")
+        )
+        self.cache_hits = self.counter(
+            "it_cache_hits_total", "Result cache hits."
+        )
+        self.cache_misses = self.counter(
+            "it_cache_misses_total", "Result cache misses."
+        )
+        self.cache_entries = self.gauge(
+            "it_cache_entries", "Entries in the result cache."
+        )
+        self.cache_bytes = self.gauge(
+            "it_cache_bytes", "Total size of the result cache."
+        )
+
+    def observe_profile(self, hooks):
+        self.profiled.inc()
+        for (plugin, hook), (calls, _, seconds, _) in hooks.items():
+            self.plugin_seconds.inc(plugin, amount=seconds)
+            self.hook_seconds.inc(plugin, hook, amount=seconds)
+            self.hook_calls.inc(plugin, hook, amount=calls)
+
+    def observe_cache(self, cache):
+        self.cache_hits.set(value=cache.hits)
+        self.cache_misses.set(value=cache.misses)
+        self.cache_entries.set(value=len(cache))
+        self.cache_bytes.set(value=cache.size)
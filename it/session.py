@@ -1,75 +1,401 @@
+import ast
+import os
+import sys
+import time
 from collections import defaultdict
-from concurrent.futures import ProcessPoolExecutor
-from dataclasses import asdict, dataclass, field
-from typing import Set
+from dataclasses import dataclass, field
+from itertools import islice
+from operator import itemgetter
+from typing import TYPE_CHECKING, List, Optional, Set
 
+from it import manifest
+from it.cache import Cache, fingerprint
 from it.config import Config
 from it.inspector import Inspector
 from it.plugin import Plugin
+from it.profile import Profile
+from it.reports import ReportBatch
 from it.utils import Group, logger
 
+if TYPE_CHECKING:
+    # imported when the pool is first used, since most (single file or
+    # serial) runs never need it
+    from concurrent.futures import ProcessPoolExecutor
+
 CORE_PLUGINS = Plugin.from_config(
-    {"it.plugins": ["context", "parentize", "general", "upgrade"]}
+    {"it.plugins": ["context", "parentize", "table", "general", "upgrade"]}
 )
 
+CHUNK_SIZE = 64 * 1024
+CHUNKS_PER_WORKER = 4
+# number of discovered files that are sized and sorted together (see
+# `schedule`), so that the first chunks are submitted while the rest of
+# the files are still being discovered
+SCHEDULE_WINDOW = 512
+
+# `ReportBatch` columns of the groups (see `Session.group_batches`)
+_GROUP_COLUMNS = {
+    Group.PLUGIN: "plugins",
+    Group.CODE: "codes",
+    Group.LINENO: "linenos",
+    Group.COLUMN: "columns",
+}
+
+# static names of the plugins that are imported in this process (workers
+# forked after the import inherit them)
+_LOADED_PLUGINS = set()
+
+
+def _file_size(file):
+    try:
+        return os.stat(file).st_size
+    except OSError:
+        return 0
+
+
+def _chunks(files, chunk_size):
+    chunk, current_size = [], 0
+    for size, index, file in files:
+        chunk.append((index, file))
+        current_size += size
+        if current_size >= chunk_size:
+            yield chunk
+            chunk, current_size = [], 0
+    if chunk:
+        yield chunk
+
+
+def schedule(
+    files,
+    workers,
+    chunk_size=CHUNK_SIZE,
+    ordered=False,
+    window=SCHEDULE_WINDOW,
+):
+    """Lazily split files into chunks of `(index, file)` pairs. Unless
+    `ordered` is given, files are taken in windows of `window` files and
+    chunks of each window are ordered from the largest files to the
+    smallest, big files get their own chunks while the small ones are
+    batched together (until they reach `chunk_size` bytes, or a share of
+    the window's total size small enough to keep all workers busy)."""
+
+    files = enumerate(files)
+    if ordered:
+        yield from _chunks(
+            ((_file_size(file), index, file) for index, file in files),
+            chunk_size,
+        )
+        return
+
+    while True:
+        batch = [
+            (_file_size(file), index, file)
+            for index, file in islice(files, window)
+        ]
+        if not batch:
+            break
+        batch.sort(key=itemgetter(0), reverse=True)
+        total_size = sum(size for size, *_ in batch)
+        share = max(1, total_size // (workers * CHUNKS_PER_WORKER))
+        yield from _chunks(batch, min(chunk_size, share))
+
 
 @dataclass
 class Session:
     config: Config = field(default_factory=Config)
     plugins: Set[Plugin] = field(default_factory=set)
+    cache: Optional[Cache] = None
+    profile: Optional[Profile] = None
+    _pool: Optional["ProcessPoolExecutor"] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _deferred: List[Plugin] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        state["profile"] = None
+        return state
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._pool = ProcessPoolExecutor(self.config.workers)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def start(self):
+        plugins = [*self.config.plugins]
         if self.config.load_core:
-            self.load_plugins(*CORE_PLUGINS)
-        self.load_plugins(*self.config.plugins)
+            plugins[:0] = CORE_PLUGINS
+        self.load_plugins(*plugins, lazy=True)
+        if self.config.profile:
+            self.profile = Profile()
+        if self.config.cache:
+            self.cache = Cache(
+                self.config.cache_dir,
+                fingerprint(self.plugins, self.config.blacklist.codes),
+                self.config.cache_size,
+            )
 
     def load_plugin(self, plugin):
         if plugin not in self.config.blacklist.plugins:
             plugin.load()
+            _LOADED_PLUGINS.add(plugin.static_name)
             self.plugins.add(plugin)
 
-    def load_plugins(self, *plugins):
+    def load_plugins(self, *plugins, lazy=False):
+        """Load the given plugins. If `lazy` is given, the plugins listed
+        in the manifest (see `it.manifest`) are only imported right before
+        the first inspection, and the ones whose hooks are never going to
+        run (due to ignored codes) are never imported."""
+
+        entries, eager = {}, False
         for plugin in plugins:
-            self.load_plugin(plugin)
+            if plugin in self.config.blacklist.plugins:
+                continue
+
+            entry = manifest.lookup(plugin) if lazy else None
+            if entry is None:
+                self.load_plugin(plugin)
+                eager = True
+                continue
+
+            python_version = tuple(entry["python_version"])
+            if python_version > sys.version_info:
+                # loaded through the buffer right away (which discards its
+                # hooks), otherwise importing it from another plugin later
+                # would register them
+                self.load_plugin(plugin)
+                continue
+
+            # set before the plugin is hashed into the set (`load()` would
+            # change it later on)
+            plugin.python_version = python_version
+            self.plugins.add(plugin)
+            entries[plugin.static_name] = entry
+
+        if eager:
+            # hooks of the unlisted plugins might require any of them
+            needed = set(entries)
+        else:
+            needed = manifest.needed_plugins(
+                entries, self.config.blacklist.codes
+            )
+        self._deferred.extend(
+            plugin
+            for plugin in plugins
+            if plugin.static_name in needed and plugin not in self._deferred
+        )
+
+    def load_deferred_plugins(self):
+        for plugin in self._deferred:
+            if plugin.static_name not in _LOADED_PLUGINS:
+                plugin.load()
+                _LOADED_PLUGINS.add(plugin.static_name)
 
     def single_inspection(self, file, strict=False):
+        return self.batch_inspection(file, strict).to_inspection()
+
+    def batch_inspection(self, file, strict=False, profile=None):
+        self.load_deferred_plugins()
+        key = None
+        if self.cache is not None and not isinstance(file, ast.AST):
+            with open(file, "rb") as source:
+                key = self.cache.key(source.read())
+            payload = self.cache.get(key)
+            if payload is not None:
+                batch = ReportBatch.from_bytes(payload)
+                batch.filename = str(file)
+                return batch
+
         try:
-            inspector = Inspector(file)
+            inspector = Inspector(
+                file,
+                ignored_codes=self.config.blacklist.codes,
+                profile=profile,
+            )
+            inspection = inspector.handle()
         except SyntaxError:
             if strict:
                 raise
             else:
                 logger.exception(f"Couldn't parse {file}")
-                return {}
+                return ReportBatch(str(file))
+
+        logger.debug(
+            f"Inspected {file}, visited {inspector.stats['visited']} nodes "
+            f"and pruned {inspector.stats['pruned']} subtrees."
+        )
+        batch = ReportBatch.from_inspection(str(inspector.file), inspection)
+        if key is not None:
+            self.cache.set(key, batch.to_bytes())
+        return batch
+
+    def source_inspection(self, source, filename="<unknown>", profile=None):
+        self.load_deferred_plugins()
+        if isinstance(source, ast.AST):
+            tree = source
         else:
-            return inspector.handle()
+            tree = ast.parse(source, filename)
+        inspector = Inspector(
+            tree, ignored_codes=self.config.blacklist.codes, profile=profile
+        )
+        return ReportBatch.from_inspection(filename, inspector.handle())
 
-    def bulk_inspection(self, *files):
+    def chunk_inspection(self, chunk):
+        # Reports are sent back as compact byte payloads rather than
+        # pickled report objects.
+        started = time.perf_counter()
+        profile = Profile() if self.config.profile else None
+        written = self.cache.written if self.cache is not None else 0
+        inspections = [
+            (
+                index,
+                file,
+                self.batch_inspection(file, profile=profile).to_bytes(),
+            )
+            for index, file in chunk
+        ]
+        if self.cache is not None:
+            written = self.cache.written - written
+        elapsed = time.perf_counter() - started
+        return inspections, elapsed, profile, written
+
+    def iter_inspections(self, files, ordered=False):
+        """Yield `(file, batch)` pairs (see `ReportBatch`) as soon as they
+        are ready. Inspections are yielded in the order of given files if `ordered`
+        is true, otherwise in the order of completion."""
+
+        for _, file, inspection in self._iter_inspections(files, ordered):
+            yield file, inspection
+
+    def _iter_inspections(self, files, ordered):
+        # before the workers are forked, so they don't import them again
+        self.load_deferred_plugins()
         if self.config.serial:
-            mapper = map
+            for index, file in enumerate(files):
+                yield index, file, self.batch_inspection(
+                    file, profile=self.profile
+                )
+        else:
+            yield from self._iter_pooled_inspections(files, ordered)
+
+        if self.cache is not None:
+            self.cache.checkpoint()
+
+    def _iter_pooled_inspections(self, files, ordered):
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        # At most `window` chunks are either running or waiting to be
+        # yielded (out of order), so the memory usage stays bounded.
+        window = self.config.workers * CHUNKS_PER_WORKER
+        chunks = enumerate(
+            schedule(files, self.config.workers, ordered=ordered)
+        )
+        pending, finished = {}, {}
+        position = total_files = busy = 0
+
+        started = time.perf_counter()
+        for number, chunk in islice(chunks, window):
+            pending[self.pool.submit(self.chunk_inspection, chunk)] = number
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                number = pending.pop(future)
+                finished[number], elapsed, profile, written = future.result()
+                busy += elapsed
+                if profile is not None:
+                    self.profile.merge(profile)
+                if self.cache is not None:
+                    # entries written by the workers (see `Cache.checkpoint`)
+                    self.cache.written += written
+
+            if ordered:
+                numbers = []
+                while position + len(numbers) in finished:
+                    numbers.append(position + len(numbers))
+                position += len(numbers)
+            else:
+                numbers = list(finished)
+
+            for number in numbers:
+                inspections = finished.pop(number)
+                total_files += len(inspections)
+                for index, file, payload in inspections:
+                    yield index, file, ReportBatch.from_bytes(payload)
+
+            for number, chunk in islice(
+                chunks, window - len(pending) - len(finished)
+            ):
+                future = self.pool.submit(self.chunk_inspection, chunk)
+                pending[future] = number
+
+        elapsed = time.perf_counter() - started
+        if total_files:
+            logger.info(
+                f"Inspected {total_files} files with {self.config.workers} "
+                f"workers in {elapsed:.2f}s (pool utilization: "
+                f"{busy / (self.config.workers * elapsed):.0%})"
+            )
+
+    def bulk_inspection(self, *files):
+        inspections = sorted(
+            self._iter_inspections(files, ordered=False), key=itemgetter(0)
+        )
+        return self.merge_inspections(
+            inspection for *_, inspection in inspections
+        )
+
+    def group_batches(self, inspection, group):
+        """Split an inspection (a `ReportBatch`, or a mapping of plugins to
+        reports) into `{key: ReportBatch}` by the given group, without the
+        reports of the ignored codes."""
+
+        if not isinstance(inspection, ReportBatch):
+            filename = next(
+                (
+                    report.filename
+                    for reports in inspection.values()
+                    for report in reports
+                ),
+                "<unknown>",
+            )
+            inspection = ReportBatch.from_inspection(filename, inspection)
+
+        batch = inspection.without_codes(self.config.blacklist.codes)
+        if group is Group.FILENAME:
+            return {batch.filename: batch} if batch else {}
+        elif group in _GROUP_COLUMNS:
+            return batch.group(_GROUP_COLUMNS[group])
         else:
-            mapper = ProcessPoolExecutor(self.config.workers).map
-        return self.merge_inspections(mapper(self.single_inspection, files))
+            raise ValueError(f"Unsupported grouping, {group}.")
 
     def group_by(self, inspection, group):
-        for plugin, reports in inspection.items():
-            for report in reports:
-                if report.code not in self.config.blacklist.codes:
-                    if group is Group.PLUGIN:
-                        yield plugin, asdict(report)
-                    elif isinstance(group, Group):
-                        yield getattr(report, group.name.lower()), {
-                            "plugin": plugin,
-                            **asdict(report),
-                        }
-                    else:
-                        raise ValueError(f"Unsupported grouping, {group}.")
+        for groupper, batch in self.group_batches(inspection, group).items():
+            for report in batch.to_dicts(
+                with_plugin=group is not Group.PLUGIN
+            ):
+                yield groupper, report
 
     def merge_inspections(self, inspections, group=Group.PLUGIN):
         all_reports = defaultdict(list)
 
         for inspection in inspections:
-            for groupper, report in self.group_by(inspection, group):
-                all_reports[groupper].append(report)
+            for groupper, batch in self.group_batches(
+                inspection, group
+            ).items():
+                all_reports[groupper].extend(
+                    batch.to_dicts(with_plugin=group is not Group.PLUGIN)
+                )
 
         return all_reports
@@ -1,5 +1,8 @@
 import ast
+import fnmatch
 import logging
+import os
+import re
 import sys
 from enum import Enum, IntEnum, auto
 from functools import lru_cache
@@ -11,6 +14,30 @@ PY38_MINUS = not PY38_PLUS
 
 USER_CONFIG = Path("~/.inspector.rc").expanduser()
 PROJECT_CONFIG = Path(".inspector.rc")
+CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser() / "it"
+)
+CACHE_SIZE = 256 * 1024 * 1024
+DAEMON_SOCKET = CACHE_DIR / "daemon.sock"
+DAEMON_TIMEOUT = 15 * 60
+WATCH_INTERVAL = 1.0
+DEFAULT_EXCLUDES = (
+    ".git",
+    ".hg",
+    ".svn",
+    ".tox",
+    ".nox",
+    ".venv",
+    "venv",
+    ".eggs",
+    "*.egg-info",
+    "__pycache__",
+    ".mypy_cache",
+    ".pytest_cache",
+    "node_modules",
+    "build",
+    "dist",
+)
 logger = logging.getLogger("it")
 
 _CONSTANT_TYPES = {"Num", "Str", "Bytes", "NameConstant", "Ellipsis"}
@@ -21,6 +48,7 @@ class Events(Enum):
     INITAL = auto()
     FINAL = auto()
     NODE_FINALIZE = auto()
+    NODE_PREPARE = auto()
     TREE_TRANSFORMER = auto()
 
 
@@ -43,9 +71,11 @@ class Group(Enum):
 
 
 def prepare_logger(
-    logging_handler_level=logging.INFO, logging_level=logging.INFO
+    logging_handler_level=logging.INFO,
+    logging_level=logging.INFO,
+    stream=None,
 ):
-    handler = logging.StreamHandler(sys.stdout)
+    handler = logging.StreamHandler(stream or sys.stdout)
     handler.setLevel(logging_handler_level)
     logger.setLevel(logging_level)
 
@@ -56,17 +86,175 @@ def prepare_logger(
     logger.addHandler(handler)
 
 
-def traverse_paths(paths):
-    files = []
+def strtobool(value):
+    """Convert a truth value (`y`, `yes`, `t`, `true`, `on`, `1` or `n`,
+    `no`, `f`, `false`, `off`, `0`) to 1 or 0, like the deprecated
+    `distutils.util.strtobool`."""
+
+    value = value.lower()
+    if value in {"y", "yes", "t", "true", "on", "1"}:
+        return 1
+    elif value in {"n", "no", "f", "false", "off", "0"}:
+        return 0
+    else:
+        raise ValueError(f"invalid truth value {value!r}")
+
+
+def traverse_paths(paths, exclude=(), gitignore=True, directories=None):
+    """Lazily yield python files under the given paths (files are yielded
+    as is). Directories matching one of the `exclude` globs (in addition to
+    `DEFAULT_EXCLUDES`) or ignored by a `.gitignore` are never entered, the
+    entered ones are added to the `directories` set (if given)."""
+
     for path in paths:
         if not path.exists():
             raise FileNotFoundError(path)
 
+    exclude = re.compile(
+        "|".join(map(fnmatch.translate, (*DEFAULT_EXCLUDES, *exclude)))
+    )
+    return _traverse_paths(paths, exclude, gitignore, directories)
+
+
+def _traverse_paths(paths, exclude, gitignore, entered):
+    for path in paths:
         if path.is_file():
-            files.append(path)
+            yield path
+            continue
+
+        root = os.fspath(path)
+        rules = _ancestor_rules(root) if gitignore else []
+        stack = [(root, rules)]
+        while stack:
+            directory, rules = stack.pop()
+            if entered is not None:
+                entered.add(directory)
+            if gitignore:
+                rules = rules + _read_gitignore(directory)
+
+            directories = []
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+            for entry in entries:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.name.endswith(".py"):
+                    continue
+                if exclude.match(entry.name) or exclude.match(
+                    entry.path[len(root) + 1 :]
+                ):
+                    continue
+                if rules and _is_ignored(rules, entry, is_dir):
+                    continue
+
+                if is_dir:
+                    directories.append((entry.path, rules))
+                elif entry.is_file():
+                    yield Path(entry.path)
+            stack.extend(reversed(directories))
+
+
+def _translate_gitignore(pattern):
+    parts = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+        elif pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+            continue
+        elif char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[" and "]" in pattern[index + 1 :]:
+            end = pattern.index("]", index + 1)
+            parts.append(pattern[index : end + 1].replace("[!", "[^"))
+            index = end + 1
+            continue
         else:
-            files.extend(path.glob("**/*.py"))
-    return files
+            parts.append(re.escape(char))
+        index += 1
+    return re.compile("".join(parts))
+
+
+@lru_cache(512)
+def _compile_gitignore(line):
+    line = line.rstrip()
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    anchored = "/" in line
+    return (
+        _translate_gitignore(line.lstrip("/")),
+        negated,
+        dir_only,
+        anchored,
+    )
+
+
+def _read_gitignore(directory, prefix="", offset=None):
+    # Rules are stored with a `(prefix, offset)` pair that turns an entry's
+    # path into a path relative to the .gitignore's directory (without
+    # calling os.path.relpath for every entry).
+    try:
+        with open(os.path.join(directory, ".gitignore")) as gitignore:
+            lines = gitignore.read().splitlines()
+    except OSError:
+        return []
+
+    rules = tuple(filter(None, map(_compile_gitignore, lines)))
+    if offset is None:
+        offset = len(directory) + 1
+    return [(prefix, offset, rules)] if rules else []
+
+
+def _ancestor_rules(root):
+    # .gitignore files of the parent directories, up to the root
+    # of the repository (if the path is in one)
+    path = Path(os.path.abspath(root))
+    for repository in path.parents:
+        if (repository / ".git").exists():
+            break
+    else:
+        return []
+
+    rules = []
+    for ancestor in reversed(path.parents):
+        if len(ancestor.parts) >= len(repository.parts):
+            prefix = path.relative_to(ancestor).as_posix() + "/"
+            rules.extend(
+                _read_gitignore(os.fspath(ancestor), prefix, len(root) + 1)
+            )
+    return rules
+
+
+def _is_ignored(rules, entry, is_dir):
+    ignored = False
+    for prefix, offset, directory_rules in rules:
+        relative = None
+        for pattern, negated, dir_only, anchored in directory_rules:
+            if dir_only and not is_dir:
+                continue
+            if anchored:
+                if relative is None:
+                    relative = prefix + entry.path[offset:].replace(
+                        os.sep, "/"
+                    )
+                matched = pattern.fullmatch(relative)
+            else:
+                matched = pattern.fullmatch(entry.name)
+            if matched:
+                ignored = not negated
+    return ignored
 
 
 def mark(func):
@@ -0,0 +1,136 @@
+"""Git helpers for inspecting only what has changed since a revision."""
+
+import os
+import re
+import subprocess
+from pathlib import Path
+
+_HUNK = re.compile(r"@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+class GitError(RuntimeError):
+    pass
+
+
+def _git(*args, cwd=None):
+    try:
+        process = subprocess.run(
+            # paths are printed as is (rather than quoted) in the diffs
+            ("git", "-c", "core.quotePath=off", *args),
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+    except FileNotFoundError as exc:
+        raise GitError("Couldn't find the git executable") from exc
+    except subprocess.CalledProcessError as exc:
+        raise GitError(exc.stderr.decode(errors="replace").strip()) from exc
+    return process.stdout.decode()
+
+
+def _split(output):
+    return [entry for entry in output.split("\0") if entry]
+
+
+def repository_root(cwd=None):
+    return Path(_git("rev-parse", "--show-toplevel", cwd=cwd).strip())
+
+
+def changed_files(revision, include_untracked=False, cwd=None):
+    """Python files that are added or modified (either committed, staged
+    or in the working tree) since `revision`, and optionally the untracked
+    ones. Renamed files are counted as added."""
+
+    root = repository_root(cwd)
+    files = _split(
+        _git(
+            "diff",
+            "--name-only",
+            "--no-renames",
+            "--diff-filter=AM",
+            "-z",
+            revision,
+            "--",
+            "*.py",
+            cwd=root,
+        )
+    )
+    if include_untracked:
+        files.extend(
+            _split(
+                _git(
+                    "ls-files",
+                    "--others",
+                    "--exclude-standard",
+                    "-z",
+                    "--",
+                    "*.py",
+                    cwd=root,
+                )
+            )
+        )
+    return [root / file for file in dict.fromkeys(files)]
+
+
+def changed_lines(revision, files, cwd=None):
+    """Map each of the given files to a list of `(start, end)` line ranges
+    (both inclusive) which were added or modified since `revision`. Files
+    that git doesn't know about (untracked ones) are mapped to `None`,
+    which means the whole file."""
+
+    root = repository_root(cwd)
+    paths = {
+        Path(os.path.relpath(file, root)).as_posix(): file for file in files
+    }
+    if not paths:
+        return {}
+
+    diff = _git(
+        "diff",
+        "-U0",
+        "--no-renames",
+        "--no-prefix",
+        "--no-ext-diff",
+        "--no-color",
+        revision,
+        "--",
+        *paths,
+        cwd=root,
+    )
+    ranges, current, header = {}, None, False
+    for line in diff.split("\n"):
+        if line.startswith("diff --git "):
+            current, header = None, True
+        elif header and line.startswith("+++ "):
+            # `/dev/null` for the deleted files
+            current = ranges.setdefault(line[4:].rstrip("\t"), [])
+        elif line.startswith("@@"):
+            header = False
+            hunk = _HUNK.match(line)
+            if hunk is None or current is None:
+                continue
+            start, count = hunk.groups()
+            if count != "0":
+                current.append((int(start), int(start) + int(count or 1) - 1))
+
+    # files without any changes are either unchanged or unknown to git
+    # (untracked, which means the whole file)
+    unchanged = [path for path in paths if path not in ranges]
+    if unchanged:
+        tracked = set(
+            _split(_git("ls-files", "-z", "--", *unchanged, cwd=root))
+        )
+    else:
+        tracked = set()
+
+    return {
+        file: ranges.get(path, [] if path in tracked else None)
+        for path, file in paths.items()
+    }
+
+
+def in_ranges(lineno, ranges):
+    return ranges is None or any(
+        start <= lineno <= end for start, end in ranges
+    )
@@ -0,0 +1,255 @@
+"""Watch mode, which keeps a started `Session` (its plugins and its
+process pool) alive and re-inspects only the files that changed since
+the last round, printing the new and the resolved findings.
+
+Changes are found by polling `(mtime, size)` of the known files. Known
+directories are polled as well, the paths are only scanned again when
+one of them changes (an entry is added, removed or renamed). On Linux,
+inotify (if it is available) wakes the watcher up as soon as something
+happens, instead of at the next polling interval."""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+
+from it.utils import logger, traverse_paths
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+
+# seconds to wait after an inotify event, so that the rest of the events
+# of the same save (temporary files, renames) end up in the same round
+SETTLE_TIME = 0.05
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _stats(paths):
+    stats = {path: _stat(path) for path in paths}
+    return {path: stat for path, stat in stats.items() if stat is not None}
+
+
+class Inotify:
+    """Waits for the events on the watched directories. Events themselves
+    are discarded, they only cut the waiting short (changes are still found
+    by polling)."""
+
+    MASK = (
+        IN_MODIFY
+        | IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+        | IN_DELETE_SELF
+        | IN_MOVE_SELF
+    )
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    @classmethod
+    def create(cls):
+        """An `Inotify`, or None if it isn't supported here."""
+
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return cls()
+        except (OSError, AttributeError) as exc:
+            logger.debug(f"Couldn't use inotify, polling instead: {exc}")
+            return None
+
+    def watch(self, directory):
+        """Watch the directory, return False if it can't be watched (e.g.
+        the watch limit is reached). Such directories are still polled,
+        their changes are just found at the next polling interval."""
+
+        # watching the same directory again just updates the old watch
+        if self._add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            errno = ctypes.get_errno()
+            logger.debug(
+                f"Couldn't watch {directory}, polling it instead: "
+                f"{os.strerror(errno)}"
+            )
+            return False
+        return True
+
+    def wait(self, timeout):
+        """Wait until an event comes (returns True) or the timeout
+        expires (returns False)."""
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+
+        time.sleep(SETTLE_TIME)
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Watcher:
+    def __init__(self, session, paths, inotify=None):
+        self.session = session
+        self.paths = paths
+        self.inotify = inotify
+        # path => (mtime, size)
+        self.files = {}
+        self.directories = {}
+        # file => findings (a set of `(plugin, code, lineno, column)` rows)
+        self.findings = {}
+
+    def scan(self):
+        directories = set()
+        files = traverse_paths(
+            [path for path in self.paths if path.exists()],
+            self.session.config.exclude,
+            self.session.config.gitignore,
+            directories,
+        )
+        files = _stats(files)
+        self.directories = _stats(directories)
+        if self.inotify is not None:
+            for directory in self.directories:
+                self.inotify.watch(directory)
+        return files
+
+    def poll(self):
+        """Return the changed (or added) and the removed files since the
+        last poll."""
+
+        if any(
+            _stat(directory) != stat
+            for directory, stat in self.directories.items()
+        ) or not (self.files or self.directories):
+            files = self.scan()
+        else:
+            files = _stats(self.files)
+
+        changed = [
+            file
+            for file, stat in files.items()
+            if self.files.get(file) != stat
+        ]
+        removed = [file for file in self.files if file not in files]
+        self.files = files
+        return changed, removed
+
+    def inspect(self, changed, removed):
+        """Re-inspect the changed files, and return the new and the resolved
+        findings as lists of `(file, finding)` pairs."""
+
+        new, resolved = [], []
+        for file in removed:
+            for finding in sorted(self.findings.pop(file, ())):
+                resolved.append((file, finding))
+
+        for file, batch in self.session.iter_inspections(changed):
+            findings = frozenset(batch)
+            previous = self.findings.get(file, frozenset())
+            new.extend(
+                (file, finding) for finding in sorted(findings - previous)
+            )
+            resolved.extend(
+                (file, finding) for finding in sorted(previous - findings)
+            )
+            if findings:
+                self.findings[file] = findings
+            else:
+                self.findings.pop(file, None)
+        return new, resolved
+
+    def wait(self, interval):
+        if self.inotify is None:
+            time.sleep(interval)
+        else:
+            self.inotify.wait(interval)
+
+    def run(self, interval, rounds=None):
+        """Inspect all files, then keep re-inspecting the changed ones
+        (until interrupted or `rounds` are made)."""
+
+        round_ = 0
+        while rounds is None or round_ < rounds:
+            if round_:
+                self.wait(interval)
+            round_ += 1
+
+            changed, removed = self.poll()
+            if not (changed or removed):
+                continue
+            new, resolved = self.inspect(changed, removed)
+            show_changes(new, resolved)
+            logger.info(
+                f"{len(changed)} changed, {len(removed)} removed files; "
+                f"{len(new)} new, {len(resolved)} resolved findings "
+                f"({sum(map(len, self.findings.values()))} in total)"
+            )
+
+
+def _format_change(sign, file, finding):
+    plugin, code, lineno, column = finding
+    position = f"{lineno}:{column}"
+    return (
+        f"{sign} {file}:{position}{' ' * (8 - len(position))}"
+        f"=> {code} [{plugin}]"
+    )
+
+
+def show_changes(new, resolved):
+    lines = [
+        *(_format_change("-", file, finding) for file, finding in resolved),
+        *(_format_change("+", file, finding) for file, finding in new),
+    ]
+    if lines:
+        logger.info("\n".join(lines))
+
+
+def watch(session, paths):
+    """Watch the given paths until interrupted."""
+
+    inotify = Inotify.create() if session.config.inotify else None
+    watcher = Watcher(session, paths, inotify)
+    logger.info(
+        f"Watching {len(paths)} paths "
+        f"({'inotify' if inotify is not None else 'polling'}), "
+        f"press Ctrl+C to stop."
+    )
+    try:
+        watcher.run(session.config.watch_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if inotify is not None:
+            inotify.close()
+        session.shutdown()
@@ -0,0 +1,126 @@
+import os
+
+import pytest
+
+from it.cache import Cache, MemoryCache, fingerprint
+from it.config import Config
+from it.plugin import Plugin
+from it.session import Session
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return Cache(tmp_path / "cache", "fingerprint", max_size=1024)
+
+
+def test_cache_get_set(cache):
+    key = cache.key(b"a = 1")
+    assert key == cache.key(b"a = 1")
+    assert key != cache.key(b"a = 2")
+    assert cache.get(key) is None
+
+    cache.set(key, b"payload")
+    assert cache.get(key) == b"payload"
+    assert cache.path(key).exists()
+
+
+def test_cache_key_fingerprint(tmp_path, cache):
+    other_cache = Cache(tmp_path / "cache", "other fingerprint", 1024)
+    assert cache.key(b"a = 1") != other_cache.key(b"a = 1")
+
+
+def test_cache_prune(cache):
+    keys = [cache.key(str(idx).encode()) for idx in range(4)]
+    for age, key in enumerate(keys):
+        cache.set(key, b"x" * 400)
+        os.utime(cache.path(key), (age, age))
+
+    cache.get(keys[0])
+    cache.prune()
+    assert [cache.get(key) is not None for key in keys] == [
+        True,
+        False,
+        False,
+        True,
+    ]
+
+
+def test_cache_checkpoint(cache, mocker):
+    prune = mocker.spy(cache, "prune")
+    cache.set(cache.key(b"0"), b"x" * 400)
+    # no estimate yet
+    cache.checkpoint()
+    assert prune.call_count == 1
+    assert (cache.directory / "state").read_text() == "400 0\n"
+
+    cache.set(cache.key(b"1"), b"x" * 400)
+    cache.checkpoint()
+    assert prune.call_count == 1
+    assert (cache.directory / "state").read_text() == "800 1\n"
+
+    cache.set(cache.key(b"2"), b"x" * 400)
+    cache.checkpoint()
+    assert prune.call_count == 2
+    assert (cache.directory / "state").read_text() == "800 0\n"
+
+    mocker.patch("it.cache.PRUNE_INTERVAL", 3)
+    cache.checkpoint()
+    cache.checkpoint()
+    assert prune.call_count == 2
+    cache.checkpoint()
+    assert prune.call_count == 3
+
+
+def test_fingerprint():
+    plugins = {Plugin.from_simple("@context"), Plugin.from_simple("@general")}
+    assert fingerprint(plugins) == fingerprint(set(plugins))
+    assert fingerprint(plugins) != fingerprint(
+        {Plugin.from_simple("@context")}
+    )
+    assert fingerprint(plugins) != fingerprint(plugins, ["SUPER_ARGS"])
+
+
+def test_session_cache(tmp_path, monkeypatch):
+    source = tmp_path / "a.py"
+    source.write_text("def foo(x=[]): pass\n")
+    copy = tmp_path / "b.py"
+    copy.write_text(source.read_text())
+
+    session = Session(Config(cache_dir=tmp_path / "cache"))
+    session.start()
+    inspection = session.single_inspection(source)
+    assert inspection["general"][0].code == "DEFAULT_MUTABLE_ARG"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached file shouldn't be inspected")
+
+    monkeypatch.setattr("it.session.Inspector", fail)
+    assert session.single_inspection(source) == inspection
+    assert session.single_inspection(copy)["general"][0].filename == str(copy)
+
+
+def test_memory_cache():
+    cache = MemoryCache("fingerprint", max_entries=3, max_size=10)
+    assert cache.key(b"a") == Cache("", "fingerprint", 0).key(b"a")
+    for key in "abc":
+        cache.set(key, b"xxx")
+    assert cache.get("a") == b"xxx"
+    cache.set("d", b"xxx")
+    assert cache.get("b") is None
+    assert len(cache) == 3
+
+    cache.set("e", b"xxxx")
+    assert [cache.get(key) is not None for key in "acde"] == [
+        True,
+        False,
+        True,
+        True,
+    ]
+    cache.set("f", b"x" * 11)
+    assert cache.get("f") is None
+    assert cache.stats() == {
+        "hits": 4,
+        "misses": 3,
+        "entries": 3,
+        "size": 10,
+    }
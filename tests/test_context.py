@@ -0,0 +1,81 @@
+import ast
+import sys
+from collections import defaultdict
+from functools import partial
+
+import pytest
+
+from it.plugins.context import (
+    CTX_TYPES,
+    Contexts,
+    ScopeIndex,
+    collect_contexts,
+    get_context,
+    initalize_contexts,
+    prepare_contexts,
+)
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 8), reason="context requires Python 3.8+"
+)
+
+SOURCE = """\
+class A:
+    def b(self): super(A, self).c()
+    def c(self):
+        class D: pass
+        call()
+x = call()
+class E: pass; call()
+"""
+
+
+def prepare(source):
+    tree = ast.parse(source)
+    db = defaultdict(partial(defaultdict, dict))
+    initalize_contexts(db)
+    for node in ast.walk(tree):
+        if isinstance(node, tuple(CTX_TYPES)):
+            collect_contexts(node, None, db)
+    prepare_contexts(tree, db)
+    return tree, db
+
+
+def test_scope_index():
+    tree, db = prepare(SOURCE)
+    index = db["context"]["scopes"]
+    assert isinstance(index, ScopeIndex)
+    assert len(index) == 5
+    assert [context.name for context in index.contexts] == [
+        "A",
+        "b",
+        "c",
+        "D",
+        "E",
+    ]
+    assert index.parents == [-1, 0, 0, 2, -1]
+
+
+def test_get_context():
+    tree, db = prepare(SOURCE)
+    calls = [
+        node
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+    ]
+    contexts = {
+        (call.lineno, call.func.id): get_context(call, db) for call in calls
+    }
+    assert contexts[2, "super"].name == "b"
+    assert contexts[5, "call"].name == "c"
+    assert contexts[6, "call"].context is Contexts.GLOBAL
+    assert contexts[7, "call"].name == "E"
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            assert get_context(node, db).name == node.name
+
+
+def test_get_context_without_module():
+    db = defaultdict(partial(defaultdict, dict))
+    assert get_context(ast.parse("x").body[0], db) is None
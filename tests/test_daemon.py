@@ -0,0 +1,106 @@
+import socket
+import threading
+
+import pytest
+
+from it import daemon
+from it.config import Blacklist, Config
+from it.session import Session
+
+
+@pytest.fixture
+def session(tmp_path):
+    session = Session(
+        Config(
+            serial=True,
+            cache=False,
+            daemon_socket=tmp_path / "it.sock",
+            daemon_timeout=0.5,
+        )
+    )
+    session.start()
+    return session
+
+
+def test_daemon(tmp_path, session):
+    source = tmp_path / "a.py"
+    source.write_text("def foo(x=[]): pass\n")
+
+    config = Config()
+    with pytest.raises(daemon.DaemonError):
+        daemon.request(session.config.daemon_socket, [source], config)
+
+    server = threading.Thread(target=daemon.serve, args=(session,))
+    server.start()
+    while True:
+        try:
+            result = daemon.request(
+                session.config.daemon_socket, [source], config
+            )
+        except daemon.DaemonError:
+            continue
+        else:
+            break
+    assert result["general"][0]["code"] == "DEFAULT_MUTABLE_ARG"
+    assert result["general"][0]["filename"] == str(source)
+
+    config.blacklist.codes.append("DEFAULT_MUTABLE_ARG")
+    result = daemon.request(session.config.daemon_socket, [source], config)
+    assert result == {}
+
+    # discovery options of the client
+    config = Config(exclude=["excluded"])
+    excluded = tmp_path / "excluded"
+    excluded.mkdir()
+    (excluded / "b.py").write_text("def bar(x=[]): pass\n")
+    result = daemon.request(session.config.daemon_socket, [tmp_path], config)
+    assert [report["filename"] for report in result["general"]] == [
+        str(source)
+    ]
+
+    # plugins can't be ignored per request
+    config.blacklist = Blacklist(["@general"])
+    with pytest.raises(daemon.DaemonError, match="different set of plugins"):
+        daemon.request(session.config.daemon_socket, [source], config)
+
+    # neither the codes that only the daemon ignores
+    config.blacklist = Blacklist()
+    session.config.blacklist.codes.append("SUPER_ARGS")
+    with pytest.raises(daemon.DaemonError, match="ignores codes"):
+        daemon.request(session.config.daemon_socket, [source], config)
+    config.blacklist.codes.append("SUPER_ARGS")
+    assert daemon.request(session.config.daemon_socket, [source], config)
+
+    # the live daemon keeps its address
+    with pytest.raises(daemon.DaemonError, match="already listening"):
+        daemon.serve(session)
+
+    server.join()
+    assert not session.config.daemon_socket.exists()
+
+
+def test_daemon_closed_connection(tmp_path):
+    address = tmp_path / "it.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(address))
+        server.listen()
+
+        def close():
+            connection, _ = server.accept()
+            connection.close()
+
+        thread = threading.Thread(target=close)
+        thread.start()
+        with pytest.raises(daemon.DaemonError):
+            daemon.request(address, [tmp_path], Config())
+        thread.join()
+
+
+def test_daemon_stale_socket(session):
+    address = session.config.daemon_socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(str(address))
+    assert address.exists()
+
+    daemon.serve(session)
+    assert not address.exists()
@@ -0,0 +1,54 @@
+import sys
+
+import pytest
+
+from it.config import Config
+from it.plugins.general import EXC_TREE
+from it.session import Session
+from it.utils import Group
+
+DEFINITIONS = """\
+class MyError(ValueError): pass
+class OtherError(MyError, KeyError): pass
+try: pass
+except ValueError: pass
+except OtherError: pass
+"""
+USAGE = """\
+try: pass
+except Exception: pass
+except MyError: pass
+"""
+
+
+@pytest.fixture
+def session():
+    session = Session(Config(cache=False))
+    session.start()
+    return session
+
+
+def codes(session, source):
+    inspection = session.source_inspection(source)
+    return dict(session.group_by(inspection, Group.CODE))
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 8), reason="requires the context plugin"
+)
+def test_user_exceptions(session):
+    snapshot = dict(EXC_TREE)
+    assert "UNREACHABLE_EXCEPT" in codes(session, DEFINITIONS)
+    # definitions from other inspections don't leak
+    assert "UNREACHABLE_EXCEPT" not in codes(session, USAGE)
+    assert "UNREACHABLE_EXCEPT" in codes(session, DEFINITIONS + USAGE)
+    assert EXC_TREE == snapshot
+
+    with pytest.raises(TypeError):
+        EXC_TREE["MyError"] = ()
+    assert EXC_TREE["IOError"] == (
+        "IOError",
+        "OSError",
+        "Exception",
+        "BaseException",
+    )
@@ -1,18 +1,38 @@
 import ast
+import pickle
+import sys
 
 import pytest
 
 from it import Inspector
 from it.inspector import BufferExit
 from it.plugin import Plugin
+from it.profile import Profile
+from it.utils import Events
+
+# subtrees are pruned according to the ASDL signatures in the docstrings
+# of the node types, which are only there on Python 3.8+
+PRUNES = sys.version_info >= (3, 8)
 
 
 @pytest.fixture
 def clear():
-    Inspector._hooks.clear()
-    Inspector._event_hooks.clear()
-    Inspector._hooks_buffer.clear()
-    Inspector._event_hooks_buffer.clear()
+    registries = (
+        Inspector._hooks,
+        Inspector._event_hooks,
+        Inspector._hooks_buffer,
+        Inspector._event_hooks_buffer,
+    )
+    backups = [
+        {trigger: hooks.copy() for trigger, hooks in registry.items()}
+        for registry in registries
+    ]
+    for registry in registries:
+        registry.clear()
+    yield
+    for registry, backup in zip(registries, backups):
+        registry.clear()
+        registry.update(backup)
 
 
 @pytest.fixture
@@ -65,13 +85,124 @@ def test_inspector_buffer(clear, dummy):
     assert dummy in Inspector._hooks[4]
 
 
-def test_inspector_getattr(clear, dummy):
+def test_inspector_dispatch(clear, dummy):
     Inspector.register(ast.Name)(dummy)
+    finalizer = Inspector.on_event(Events.NODE_FINALIZE)(
+        Inspector.register(ast.expr)(lambda *args: None)
+    )
 
-    inspector = Inspector(ast.Module())
-    visitor = inspector.visit_Name
-    assert visitor.func == inspector.visitor
-    assert dummy in visitor.args[0]
+    preparer = Inspector.on_event(Events.NODE_PREPARE)(
+        Inspector.register(ast.stmt, ast.Name)(lambda *args: None)
+    )
 
-    with pytest.raises(AttributeError):
-        inspector.duhkjhkjdsabc
+    inspector = Inspector(ast.Module())
+    assert inspector.dispatch[ast.Name] == (
+        (dummy,),
+        (finalizer,),
+        (preparer,),
+        not PRUNES,
+    )
+    assert inspector.dispatch[ast.Call] == ((), (finalizer,), (), True)
+    assert inspector.dispatch[ast.Pass] == ((), (), (preparer,), True)
+    assert inspector.dispatch[ast.Module] == ((), (), (), True)
+    assert Inspector(ast.Module()).dispatch is inspector.dispatch
+
+    Inspector.register(ast.Call)(dummy)
+    assert Inspector(ast.Module()).dispatch[ast.Call] == (
+        (dummy,),
+        (finalizer,),
+        (),
+        True,
+    )
+    assert Inspector(ast.Module(), ignored_codes={"MY_ERROR"}).dispatch[
+        ast.Call
+    ] == ((), (finalizer,), (), True)
+
+
+def test_inspector_visit(clear, dummy):
+    Inspector.register(ast.Name)(dummy)
+    finalized = []
+    Inspector.on_event(Events.NODE_FINALIZE)(
+        Inspector.register(ast.stmt)(
+            lambda node, db: finalized.append(type(node))
+        )
+    )
+
+    parents = {}
+    Inspector.on_event(Events.NODE_PREPARE)(
+        Inspector.register(ast.expr)(
+            lambda node, parent, db: parents.setdefault(
+                type(node), type(parent)
+            )
+        )
+    )
+
+    results = Inspector(ast.parse("a = b\nc\n")).handle()
+    assert [report.lineno for report in results["dummy"]] == [1, 1, 2]
+    assert finalized == [ast.Assign, ast.Expr]
+    assert parents == {ast.Name: ast.Assign}
+
+
+@pytest.mark.skipif(not PRUNES, reason="no pruning before Python 3.8")
+def test_inspector_prune(clear, dummy):
+    Inspector.register(ast.FunctionDef)(dummy)
+    inspector = Inspector(ast.Module())
+    assert not inspector.dispatch[ast.Lambda][3]
+    assert not inspector.dispatch[ast.Name][3]
+    assert inspector.dispatch[ast.If][3]
+    assert inspector.dispatch[ast.Constant][3]
+
+    tree = ast.parse("x = lambda: y\nif x:\n    def f(): pass\n")
+    inspector = Inspector(tree)
+    results = inspector.handle()
+    assert [report.lineno for report in results["dummy"]] == [3]
+    assert inspector.stats["pruned"] == 3
+    assert inspector.stats["visited"] == 7
+
+    inspector = Inspector(tree, ignored_codes={"MY_ERROR"})
+    assert not inspector.handle()
+    assert inspector.stats["visited"] == 1
+
+
+def test_inspector_prepare(clear, dummy):
+    Inspector.on_event(Events.NODE_FINALIZE)(
+        Inspector.register(ast.AST)(dummy)
+    )
+    tree = ast.parse("def f(a):\n    return a\nb\n")
+    nodes, entries, ends, parents = Inspector(tree).prepare(tree)
+
+    def preorder(node):
+        yield node
+        for child in ast.iter_child_nodes(node):
+            yield from preorder(child)
+
+    assert nodes == list(preorder(tree))
+    assert len(entries) == len(nodes)
+    assert ends[0] == len(nodes)
+    function = nodes.index(tree.body[0])
+    assert nodes[ends[function]] is tree.body[1]
+    assert parents[0] == -1
+    assert nodes[parents[function + 1]] is tree.body[0]
+
+
+def test_inspector_profile(clear, dummy):
+    Inspector.register(ast.Name, ast.Attribute)(dummy)
+    profile = Profile()
+    tree = ast.parse("a = b + c.d")
+    results = Inspector(tree, profile=profile).handle()
+    Inspector(tree, profile=profile).handle()
+
+    assert len(results["dummy"]) == 4
+    assert profile.hooks["dummy", "my_error"][0] == 8
+    assert profile.node_types["Name"][0] == 6
+    assert profile.node_types["Attribute"][0] == 2
+    assert profile.hooks["dummy", "my_error"][1] == 8
+    assert profile.hooks["dummy", "my_error"][3] <= (
+        profile.hooks["dummy", "my_error"][2]
+    )
+    assert profile.as_dict()["hooks"][0]["hook"] == "my_error"
+    assert "dummy.my_error" in profile.format_table()
+
+    other = pickle.loads(pickle.dumps(profile))
+    other.merge(profile)
+    assert other.hooks["dummy", "my_error"][0] == 16
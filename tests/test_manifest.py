@@ -0,0 +1,84 @@
+import json
+import subprocess
+import sys
+import textwrap
+
+from it import manifest
+
+
+def test_manifest_is_up_to_date():
+    # in a fresh interpreter (like `bin/generate_manifest.py`), plugins
+    # loaded by the other tests might have had their hooks discarded
+    script = textwrap.dedent("""
+        import json
+        from it import manifest
+        expected = manifest.build_manifest(manifest.discover_plugins())
+        print(json.dumps(expected["plugins"]))
+        """)
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, stdout=subprocess.PIPE
+    ).stdout
+    assert manifest.load_manifest() == json.loads(output)
+
+
+def test_needed_plugins():
+    entries = manifest.load_manifest()
+    upgrade = {
+        hook["code"]
+        for hook in entries["it.plugins.upgrade"]["hooks"]
+        if hook["code"]
+    }
+    assert manifest.needed_plugins(entries) == set(entries)
+    assert manifest.needed_plugins(entries, upgrade) == set(entries) - {
+        "it.plugins.upgrade"
+    }
+
+    entries = {
+        name: entry
+        for name, entry in entries.items()
+        if name in {"it.plugins.context", "it.plugins.general"}
+    }
+    hooks = entries["it.plugins.context"]["hooks"]
+    entries["it.plugins.context"] = {
+        **entries["it.plugins.context"],
+        "hooks": [hook for hook in hooks if not hook["events"]],
+    }
+    context = {hook["code"] for hook in entries["it.plugins.context"]["hooks"]}
+    assert manifest.needed_plugins(entries, context) == set(entries)
+    assert manifest.needed_plugins(
+        entries, context | {"CONTROL_FLOW_INSIDE_FINALLY"}
+    ) == {"it.plugins.general"}
+
+
+def test_lazy_plugins():
+    script = textwrap.dedent("""
+        import json, sys
+        from it.config import Config
+        from it.manifest import load_manifest
+        from it.session import Session
+
+        codes = [
+            hook["code"]
+            for hook in load_manifest()["it.plugins.upgrade"]["hooks"]
+        ]
+        session = Session(Config(cache=False))
+        session.config.blacklist.codes.extend(codes)
+        session.start()
+        before = sorted(name for name in sys.modules if "it.plugins." in name)
+        session.single_inspection(sys.argv[1])
+        after = sorted(name for name in sys.modules if "it.plugins." in name)
+        print(json.dumps([before, after]))
+        """)
+    output = subprocess.run(
+        [sys.executable, "-c", script, manifest.BASE / "general.py"],
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout
+    before, after = json.loads(output)
+    if sys.version_info >= (3, 8):
+        assert before == []
+    else:
+        # unsupported plugins are loaded (and discarded) right away
+        assert before == ["it.plugins.context"]
+    assert "it.plugins.general" in after
+    assert "it.plugins.upgrade" not in after
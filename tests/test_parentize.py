@@ -0,0 +1,107 @@
+import ast
+import sys
+from collections import defaultdict
+from functools import partial
+
+import pytest
+
+from it.config import Config
+from it.plugins.parentize import (
+    free_parents,
+    get_index,
+    get_parent,
+    nearest_ancestor,
+    parent_to,
+)
+from it.session import Session
+from it.utils import Group
+
+SOURCE = """\
+def foo():
+    for x in y:
+        if x:
+            break
+"""
+
+
+def prepare(tree, pruned=()):
+    nodes, parents = [], []
+    stack = [(tree, -1)]
+    while stack:
+        node, parent = stack.pop()
+        nodes.append(node)
+        parents.append(parent)
+        if isinstance(node, pruned):
+            continue
+        stack.extend(
+            (child, len(nodes) - 1)
+            for child in reversed(list(ast.iter_child_nodes(node)))
+        )
+    db = defaultdict(partial(defaultdict, dict))
+    db["inspector"]["flattened"] = nodes, None, None, parents
+    return db
+
+
+def test_parent_index():
+    tree = ast.parse(SOURCE)
+    db = prepare(tree)
+    index = get_index(db)
+    function = tree.body[0]
+    loop = function.body[0]
+    condition = loop.body[0]
+    statement = condition.body[0]
+
+    assert get_parent(tree, db) is None
+    assert get_parent(statement, db) is condition
+    assert index.depth(statement) == 4
+    assert index.position(loop.iter) == 1
+    assert list(parent_to(statement, function, db)) == [
+        condition,
+        loop,
+        function,
+    ]
+    assert nearest_ancestor(statement, ast.For, db) is loop
+    assert nearest_ancestor(statement, ast.While, db) is None
+    assert not hasattr(statement, "parent")
+
+    assert len(index) == len(list(ast.walk(tree)))
+    free_parents(db)
+    assert "index" not in db["parentize"]
+
+
+def test_parent_index_pruned():
+    tree = ast.parse("x = lambda: y.z\n")
+    db = prepare(tree, pruned=ast.Lambda)
+    function = tree.body[0].value
+    attribute = function.body
+    assert attribute not in get_index(db).nodes
+
+    assert get_parent(attribute, db) is function
+    assert get_parent(attribute.value, db) is attribute
+    assert nearest_ancestor(attribute.value, ast.Assign, db) is tree.body[0]
+    assert get_index(db).depth(attribute) == 3
+
+    with pytest.raises(ValueError):
+        get_parent(ast.Name("x", ast.Load()), db)
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 8), reason="requires the context plugin"
+)
+def test_control_flow_inside_finally():
+    session = Session(Config(cache=False))
+    session.start()
+    source = """\
+try: pass
+finally:
+    for x in y:
+        break
+try: pass
+finally:
+    while True:
+        break
+"""
+    inspection = session.source_inspection(source)
+    # only the second try statement, break is bound to the for loop in
+    # the first one
+    assert dict(session.group_by(inspection, Group.LINENO)).keys() == {5}
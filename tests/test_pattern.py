@@ -0,0 +1,120 @@
+import ast
+
+import pytest
+
+import it.pattern
+from it.inspector import Inspector
+from it.pattern import (
+    ANY,
+    PatternSet,
+    compile_patterns,
+    constant,
+    items,
+    length,
+    name,
+    not_,
+    one_of,
+    pattern,
+)
+from it.plugin import Plugin
+
+
+def expr(source):
+    return ast.parse(source, mode="eval").body
+
+
+@pytest.fixture
+def clear(monkeypatch):
+    monkeypatch.setattr(it.pattern, "_PATTERN_SETS", {})
+    registries = (Inspector._hooks, Inspector._event_hooks)
+    backups = [
+        {trigger: hooks.copy() for trigger, hooks in registry.items()}
+        for registry in registries
+    ]
+    for registry in registries:
+        registry.clear()
+    yield
+    for registry, backup in zip(registries, backups):
+        registry.clear()
+        registry.update(backup)
+
+
+@pytest.mark.parametrize(
+    "node_pattern, source, expected",
+    [
+        (pattern(ast.Call), "foo()", True),
+        (pattern(ast.Call), "foo", False),
+        (pattern(ast.Call, func=name("foo", "bar")), "bar()", True),
+        (pattern(ast.Call, func=name("foo")), "foo.bar()", False),
+        (pattern(ast.Call, args=length(2)), "foo(a, b)", True),
+        (pattern(ast.Call, args=length(2)), "foo(a)", False),
+        (pattern(ast.Call, args=items(ast.Name, ANY)), "foo(a, 1)", True),
+        (pattern(ast.Call, args=items(ast.Name, ANY)), "foo(a)", False),
+        (pattern(ast.Call, args=[ast.Name]), "foo(1)", False),
+        (pattern(ast.Call, args=items(constant(None))), "foo(None)", True),
+        (pattern(ast.Call, args=items(constant(None))), "foo(0)", False),
+        (pattern(ast.Call, args=items(not_(ast.Name))), "foo(1)", True),
+        (pattern(ast.Call, args=items(not_(ast.Name))), "foo(a)", False),
+        (pattern(ast.Name, id=one_of("a", "b")), "b", True),
+        (pattern((ast.List, ast.Tuple), elts=length(0)), "()", True),
+    ],
+)
+def test_pattern_match(node_pattern, source, expected):
+    node = expr(source)
+    assert node_pattern.match(node) is expected
+    assert bool(compile_patterns([(0, node_pattern)])(node)) is expected
+
+
+def test_pattern_shared_conditions():
+    accesses = []
+
+    class Probe(ast.AST):
+        _fields = ("func",)
+
+        @property
+        def func(self):
+            accesses.append(self)
+            return ast.Name("foo", ast.Load())
+
+    patterns = PatternSet()
+    first = patterns.add(pattern(Probe, func=name("foo")))
+    second = patterns.add(pattern(Probe, func=name("foo", "bar")))
+    third = patterns.add(pattern(Probe, func=pattern(ast.Attribute)))
+
+    node = Probe()
+    assert patterns.matched(node) == [first, second]
+    # `func` is a name => once, `func.id` lookup (shared by both `one_of`
+    # checks) => once, `func` is an attribute => once
+    assert len(accesses) == 3
+
+    # the result is reused for the same node
+    assert patterns.matched(node) == [first, second]
+    assert len(accesses) == 3
+    assert patterns.matched(Probe()) == [first, second]
+    assert len(accesses) == 6
+    assert third not in patterns.matched(Probe())
+
+
+def test_pattern_register(clear):
+    calls = []
+
+    @Inspector.register(
+        pattern(ast.Call, func=name("list"), args=items(ast.GeneratorExp)),
+        pattern(ast.Subscript, value=name("Union")),
+    )
+    def hook(node, db):
+        calls.append(node)
+        return True
+
+    hook.plugin = Plugin.from_simple("@dummy")
+    assert hook.handles == {ast.Call, ast.Subscript}
+    assert hook.__name__ == "hook"
+    assert Inspector._hooks[ast.Call] == [hook]
+
+    tree = ast.parse("list(x for x in y)\nlist(y)\nUnion[x, y]\nfoo[x]\n")
+    results = Inspector(tree).handle()
+    assert [type(node) for node in calls] == [ast.Call, ast.Subscript]
+    assert [report.lineno for report in results["dummy"]] == [1, 3]
+
+    with pytest.raises(TypeError):
+        pattern(ast.Call, func="list")
@@ -1,6 +1,11 @@
+import csv
+import io
+import json
 from dataclasses import asdict
 
-from it.reports import Report, _prepare_result
+import pytest
+
+from it.reports import Report, ReportBatch, Reporter, _prepare_result
 
 
 def test_prepare_result(tmp_path):
@@ -16,3 +21,130 @@ def test_prepare_result(tmp_path):
         f"  - {tmp_path}/1.py:0:0     => MY_ERROR\n"
         f"  - {tmp_path}/2.py:0:0     => MY_ERROR\n"
     )
+
+
+def test_report_batch():
+    inspection = {
+        "general": [Report("MY_ERROR", 4, 1, "a.py")],
+        "upgrade": [Report("MY_ERROR", 0, 2, "a.py")] * 2,
+    }
+    batch = ReportBatch.from_inspection("a.py", inspection)
+    assert len(batch) == 3
+    assert batch.strings == ["general", "MY_ERROR", "upgrade"]
+    assert list(batch.linenos) == [1, 2, 2]
+    assert batch.to_inspection() == inspection
+
+    payload = batch.to_bytes()
+    assert ReportBatch.from_bytes(payload) == batch
+    assert ReportBatch.from_bytes(payload).to_inspection() == inspection
+    assert _prepare_result(batch) == _prepare_result(
+        {
+            plugin: [asdict(report) for report in reports]
+            for plugin, reports in inspection.items()
+        }
+    )
+
+
+def test_report_batch_group():
+    inspection = {
+        "general": [Report("MY_ERROR", 4, 1, "a.py")],
+        "upgrade": [
+            Report("OTHER_ERROR", 0, 2, "a.py"),
+            Report("MY_ERROR", 3, 5, "a.py"),
+        ],
+    }
+    batch = ReportBatch.from_inspection("a.py", inspection)
+    grouped = batch.group("plugins")
+    assert grouped.keys() == {"general", "upgrade"}
+    assert list(grouped["upgrade"]) == [
+        ("upgrade", "OTHER_ERROR", 2, 0),
+        ("upgrade", "MY_ERROR", 5, 3),
+    ]
+    assert batch.group("linenos").keys() == {1, 2, 5}
+
+    assert batch.without_codes({"UNKNOWN"}) is batch
+    assert [code for _, code, *_ in batch.without_codes({"MY_ERROR"})] == [
+        "OTHER_ERROR"
+    ]
+    assert grouped["general"].to_dicts(with_plugin=True) == [
+        {
+            "plugin": "general",
+            "code": "MY_ERROR",
+            "column": 4,
+            "lineno": 1,
+            "filename": "a.py",
+        }
+    ]
+
+
+def test_report_batch_empty():
+    batch = ReportBatch.from_bytes(ReportBatch("a.py").to_bytes())
+    assert batch.filename == "a.py"
+    assert len(batch) == 0
+    assert not batch.to_inspection()
+
+
+@pytest.fixture
+def batches():
+    return [
+        ReportBatch("a.py", ["general", "MY_ERROR"], [0], [1], [3], [4]),
+        ReportBatch("b.py"),
+        ReportBatch(
+            "c.py", ["upgrade", "OTHER"], [0, 0], [1, 1], [1, 2], [0, 5]
+        ),
+    ]
+
+
+def write(format, batches):
+    stream = io.StringIO()
+    with Reporter.formats[format](stream) as reporter:
+        for batch in batches:
+            reporter.write_reports(batch)
+    return stream.getvalue()
+
+
+def test_jsonl_reporter(batches):
+    rows = [json.loads(line) for line in write("jsonl", batches).splitlines()]
+    assert rows[0] == {
+        "plugin": "general",
+        "code": "MY_ERROR",
+        "filename": "a.py",
+        "lineno": 3,
+        "column": 4,
+    }
+    assert [row["lineno"] for row in rows] == [3, 1, 2]
+
+
+def test_csv_reporter(batches):
+    rows = list(csv.reader(io.StringIO(write("csv", batches))))
+    assert rows[0] == ["plugin", "code", "filename", "lineno", "column"]
+    assert rows[1:] == [
+        ["general", "MY_ERROR", "a.py", "3", "4"],
+        ["upgrade", "OTHER", "c.py", "1", "0"],
+        ["upgrade", "OTHER", "c.py", "2", "5"],
+    ]
+
+
+@pytest.mark.parametrize("count", [0, 3])
+def test_sarif_reporter(batches, count):
+    run = json.loads(write("sarif", batches[:count]))["runs"][0]
+    assert len(run["results"]) == count
+    assert [rule["id"] for rule in run["tool"]["driver"]["rules"]] == [
+        "MY_ERROR",
+        "OTHER",
+    ][: count and 2]
+    if count:
+        region = run["results"][0]["locations"][0]["physicalLocation"]
+        assert region["region"] == {"startLine": 3, "startColumn": 5}
+
+
+def test_text_reporter(batches):
+    assert write("text", batches) == "".join(
+        map(_prepare_result, batches[::2])
+    )
+
+
+def test_report_batch_filter(batches):
+    batch = batches[2].filter(lambda plugin, code, lineno, column: column)
+    assert list(batch) == [("upgrade", "OTHER", 2, 5)]
+    assert batch.filename == "c.py"
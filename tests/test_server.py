@@ -0,0 +1,197 @@
+import asyncio
+import json
+
+import pytest
+
+from it.config import Config
+from it.server import InspectorServer
+from it.server.metrics import ServerMetrics
+from it.session import Session
+
+
+@pytest.fixture
+def server():
+    session = Session(Config(cache=False))
+    session.start()
+    return InspectorServer(session, workers=1)
+
+
+def run(server, *requests):
+    async def communicate():
+        server.start()
+        listener = await asyncio.start_server(
+            server.handle_connection, "127.0.0.1", 0
+        )
+        host, port = listener.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+
+        responses = []
+        for method, path, body, *headers in requests:
+            body = json.dumps(body).encode()
+            headers = "".join(
+                f"{name}: {value}\r\n"
+                for name, value in dict(*headers).items()
+            )
+            writer.write(
+                f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n{headers}"
+                f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split()[1])
+            headers = dict(
+                line.split(": ", 1)
+                for line in head.decode().split("\r\n")[1:]
+                if line
+            )
+            if headers.get("Transfer-Encoding") == "chunked":
+                body = b""
+                while True:
+                    size = int(await reader.readuntil(b"\r\n"), 16)
+                    body += (await reader.readexactly(size + 2))[:-2]
+                    if not size:
+                        break
+                body = [json.loads(line) for line in body.splitlines()]
+            else:
+                length = int(headers["Content-Length"])
+                body = await reader.readexactly(length)
+                if headers.get("Content-Type") == "application/json":
+                    body = json.loads(body)
+            responses.append((status, headers, body))
+
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return responses
+
+    try:
+        return asyncio.run(communicate())
+    finally:
+        server.close()
+
+
+def test_server(server):
+    responses = run(
+        server,
+        ("POST", "/", {"source": "def foo(x=[]): pass"}),
+        ("POST", "/", {"source": "def ("}),
+        ("POST", "/", {"sourc": "x"}),
+        ("GET", "/", {}),
+    )
+    # all requests are served over the same connection
+    assert [status for status, *_ in responses] == [200, 400, 400, 200]
+    assert responses[0][1]["Connection"] == "keep-alive"
+    assert responses[0][2] == {
+        "status": "success",
+        "result": {
+            "1": {
+                "plugin": "general",
+                "code": "DEFAULT_MUTABLE_ARG",
+                "column": 0,
+                "lineno": 1,
+                "filename": "<unknown>",
+            }
+        },
+    }
+    assert "SyntaxError" in responses[1][2]["message"]
+    assert responses[3][2] == {"message": "use post method"}
+
+
+def test_server_batch(server):
+    items = [
+        {"filename": f"{index}.py", "source": f"def foo_{index}(x=[]): pass"}
+        for index in range(5)
+    ]
+    items.append({"filename": "broken.py", "source": "def ("})
+    (status, headers, lines), (other_status, *_) = run(
+        server,
+        ("POST", "/batch", {"items": items}),
+        ("POST", "/batch", {"items": [{"filename": "a.py"}]}),
+    )
+    assert status == 200
+    assert headers["Content-Type"] == "application/x-ndjson"
+    assert other_status == 400
+
+    lines = {line.pop("filename"): line for line in lines}
+    assert lines.keys() == {item["filename"] for item in items}
+    assert lines["broken.py"]["status"] == "fail"
+    assert lines["3.py"] == {
+        "status": "success",
+        "result": {
+            "general": [
+                {
+                    "code": "DEFAULT_MUTABLE_ARG",
+                    "column": 0,
+                    "lineno": 1,
+                    "filename": "3.py",
+                }
+            ]
+        },
+    }
+
+
+def test_server_cache(server):
+    source = {"source": "def foo(x=[]): pass"}
+    etag = f'"{server.cache.key(source["source"].encode())}"'
+    first, second, not_modified, other, wildcard, stats = run(
+        server,
+        ("POST", "/", source),
+        ("POST", "/", source),
+        ("POST", "/", source, {"If-None-Match": f'"other", {etag}'}),
+        ("POST", "/", {"source": "x = 1"}, {"If-None-Match": etag}),
+        ("POST", "/", source, {"If-None-Match": "*"}),
+        ("GET", "/stats", {}),
+    )
+    assert first[2] == second[2]
+    assert first[1]["ETag"] == second[1]["ETag"]
+    assert not_modified[0] == 304
+    assert not_modified[1]["ETag"] == first[1]["ETag"]
+    assert other[0] == 200
+    assert wildcard[0] == 200
+    assert wildcard[2] == first[2]
+    assert stats[2]["cache"]["hits"] == 2
+    assert stats[2]["cache"]["misses"] == 2
+    assert stats[2]["cache"]["entries"] == 2
+
+
+def test_metrics():
+    metrics = ServerMetrics()
+    metrics.requests.inc("POST", "/", "200")
+    metrics.requests.inc("POST", "/", "200")
+    metrics.phases.observe("parse", value=0.003)
+    metrics.phases.observe("parse", value=20)
+    metrics.observe_profile({("general", "my_hook"): [3, 1, 0.5, 0.25]})
+    metrics.hook_calls.inc('we"ird', "hook\n")
+
+    lines = metrics.render().splitlines()
+    assert "# TYPE it_requests_total counter" in lines
+    assert 'it_requests_total{method="POST",path="/",code="200"} 2.0' in lines
+    assert "it_requests_in_flight 0" in lines
+    bucket = 'it_phase_duration_seconds_bucket{{phase="parse",le="{}"}} {}'
+    assert bucket.format(0.0025, 0) in lines
+    assert bucket.format(0.005, 1) in lines
+    assert bucket.format("+Inf", 2) in lines
+    assert 'it_phase_duration_seconds_count{phase="parse"} 2' in lines
+    assert 'it_plugin_seconds_total{plugin="general"} 0.5' in lines
+    assert 'it_hook_calls_total{plugin="general",hook="my_hook"} 3.0' in lines
+    assert 'it_hook_calls_total{plugin="we\\"ird",hook="hook\\n"} 1.0' in lines
+
+
+def test_server_metrics(server):
+    server.profile_every = 1
+    *_, (status, headers, body) = run(
+        server,
+        ("POST", "/", {"source": "def foo(x=[]): pass"}),
+        ("POST", "/", {"source": "def ("}),
+        ("GET", "/metrics", {}),
+    )
+    metrics = server.metrics
+    assert metrics.requests.values["POST", "/", "200"] == 1
+    assert metrics.requests.values["POST", "/", "400"] == 1
+    assert metrics.parse_failures.values[()] == 1
+    assert metrics.profiled.values[()] == 1
+    assert metrics.hook_calls.values["general", "default_mutable_arg"] == 1
+    assert metrics.phases.values["inspect",][1] > 0
+    assert status == 200
+    assert headers["Content-Type"].startswith("text/plain")
+    assert b"\nit_requests_in_flight 1\n" in body
+    assert b'it_requests_total{method="POST",path="/",code="200"}' in body
@@ -0,0 +1,120 @@
+import pytest
+
+from it.config import Config
+from it.session import Session, schedule
+
+
+@pytest.fixture
+def files(tmp_path):
+    files = []
+    for index, size in enumerate((10, 500, 30, 20, 1000)):
+        file = tmp_path / f"{index}.py"
+        file.write_text("#" * (size - 1) + "\n")
+        files.append(file)
+    return files
+
+
+def test_schedule(files):
+    chunks = list(schedule(files, workers=1, chunk_size=100))
+    assert chunks == [
+        [(4, files[4])],
+        [(1, files[1])],
+        [(2, files[2]), (3, files[3]), (0, files[0])],
+    ]
+
+
+def test_schedule_balance(files):
+    chunks = list(schedule(files, workers=4))
+    assert chunks[:2] == [[(4, files[4])], [(1, files[1])]]
+    assert sorted(index for chunk in chunks for index, _ in chunk) == list(
+        range(len(files))
+    )
+
+
+def test_schedule_window(files):
+    consumed = []
+
+    def discover():
+        for file in files:
+            consumed.append(file)
+            yield file
+
+    chunks = schedule(discover(), workers=1, window=2)
+    # the largest of the first window, before the rest are discovered
+    assert next(chunks) == [(1, files[1])]
+    assert len(consumed) == 2
+    assert [index for chunk in chunks for index, _ in chunk] == [0, 2, 3, 4]
+
+
+def test_start_twice():
+    session = Session(Config(cache=False))
+    session.start()
+    session.load_deferred_plugins()
+    plugins = set(session.plugins)
+    assert all(plugin in session.plugins for plugin in plugins)
+
+    session.start()
+    assert session.plugins == plugins
+    assert len(session.plugins) == len(plugins)
+
+
+def test_pooled_inspection(tmp_path):
+    files = []
+    for index in range(5):
+        file = tmp_path / f"{index}.py"
+        file.write_text(
+            f"def foo_{index}(x=[]):\n" + "    pass\n" * (index + 1)
+        )
+        files.append(file)
+
+    session = Session(Config(workers=2, cache=False))
+    session.start()
+    pooled = session.bulk_inspection(*files)
+    session.shutdown()
+
+    session.config.serial = True
+    assert pooled == session.bulk_inspection(*files)
+    assert [report["filename"] for report in pooled["general"]] == [
+        str(file) for file in files
+    ]
+
+
+@pytest.mark.parametrize("serial", [True, False])
+def test_iter_inspections(tmp_path, serial):
+    files = []
+    for index in range(5):
+        file = tmp_path / f"{index}.py"
+        file.write_text("def foo(x=[]):\n" + "    pass\n" * (index * 50 + 1))
+        files.append(file)
+
+    session = Session(Config(workers=2, serial=serial, cache=False))
+    session.start()
+    ordered = list(session.iter_inspections(files, ordered=True))
+    unordered = list(session.iter_inspections(files))
+    session.shutdown()
+
+    assert [file for file, _ in ordered] == files
+    assert sorted(unordered, key=lambda item: files.index(item[0])) == ordered
+    for file, inspection in ordered:
+        assert inspection.filename == str(file)
+        assert inspection.strings == ["general", "DEFAULT_MUTABLE_ARG"]
+
+
+@pytest.mark.parametrize("serial", [True, False])
+def test_profile(tmp_path, serial):
+    files = []
+    for index in range(5):
+        file = tmp_path / f"{index}.py"
+        file.write_text("def foo(x=[]):\n" + "    pass\n" * (index * 50 + 1))
+        files.append(file)
+
+    session = Session(
+        Config(workers=2, serial=serial, cache=False, profile=True)
+    )
+    session.start()
+    session.bulk_inspection(*files)
+    session.shutdown()
+
+    calls, hits, *_ = session.profile.hooks["general", "default_mutable_arg"]
+    assert calls == hits == 5
+    assert session.profile.node_types["FunctionDef"][0] >= 5
@@ -0,0 +1,76 @@
+import subprocess
+import sys
+
+# microseconds; the cumulative import time of `it.__main__` (the best of a
+# few runs, the first one might compile the bytecode). `distutils.util`
+# alone used to take more than this.
+IMPORT_TIME_BUDGET = 250_000
+
+# modules that shouldn't be imported until they are needed
+LAZY_MODULES = (
+    "distutils",
+    "concurrent.futures",
+    "multiprocessing",
+    "socket",
+    "subprocess",
+    "ctypes",
+    "it.daemon",
+    "it.vcs",
+    "it.watch",
+    "it.plugins.",
+)
+
+
+def import_times(module):
+    """`module => cumulative microseconds` of all modules imported by
+    the given module, measured with `-X importtime`."""
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_time():
+    runs = [import_times("it.__main__") for _ in range(3)]
+    for module in runs[0]:
+        assert not module.startswith(LAZY_MODULES), module
+
+    best = min(times["it.__main__"] for times in runs)
+    assert best < IMPORT_TIME_BUDGET, (
+        f"importing it.__main__ took {best / 1000:.0f}ms, "
+        f"over the budget of {IMPORT_TIME_BUDGET / 1000:.0f}ms"
+    )
+
+
+def test_cli_smoke(tmp_path):
+    # runs on every interpreter of the CI matrix, including the ones that
+    # some core plugins (`context`) don't support
+    source = tmp_path / "a.py"
+    source.write_text(
+        "class A:\n"
+        "    def foo(self, x=[]):\n"
+        "        try:\n"
+        "            pass\n"
+        "        finally:\n"
+        "            return x\n"
+    )
+    process = subprocess.run(
+        [sys.executable, "-m", "it", "--serial", "--no-cache", str(source)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    assert "Traceback" not in process.stdout
+    assert f"{source}:2:4" in process.stdout
+    assert "DEFAULT_MUTABLE_ARG" in process.stdout
+    assert process.returncode == 1
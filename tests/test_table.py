@@ -0,0 +1,76 @@
+import ast
+
+import pytest
+
+from it.inspector import Inspector
+from it.plugins import table
+from it.plugins.table import NodeTable
+
+SOURCE = """\
+def foo(items):
+    for index in range(len(items)):
+        print(items[index], items[index + 1])
+    return [item for item in items[1:]]
+x = y[0]
+"""
+
+
+@pytest.fixture(params=["array", "numpy"])
+def backend(request, monkeypatch):
+    if request.param == "array":
+        monkeypatch.setattr(table, "numpy", None)
+    else:
+        pytest.importorskip("numpy")
+    return request.param
+
+
+def walk(node, node_types):
+    # pre-order, unlike ast.walk
+    if isinstance(node, node_types):
+        yield node
+    for child in ast.iter_child_nodes(node):
+        yield from walk(child, node_types)
+
+
+def test_node_table(backend):
+    tree = ast.parse(SOURCE)
+    nodes = NodeTable.from_tree(tree)
+    function = tree.body[0]
+    loop = function.body[0]
+
+    assert len(nodes) == sum(1 for _ in ast.walk(tree))
+    assert nodes.nodes[0] is tree
+    assert nodes.ends[0] == len(nodes)
+    assert nodes.parents[nodes.index(loop)] == nodes.index(function)
+    assert nodes.linenos[nodes.index(loop)] == 2
+    assert nodes.columns[nodes.index(loop)] == 4
+
+    for node in (tree, function, loop, tree.body[1]):
+        for node_types in (
+            ast.Subscript,
+            (ast.Subscript, ast.Call),
+            ast.expr,
+            ast.stmt,
+            ast.Lambda,
+        ):
+            expected = list(walk(node, node_types))
+            assert list(nodes.find(node, node_types)) == expected
+            assert nodes.count(node, node_types) == len(expected)
+
+    with pytest.raises(ValueError):
+        nodes.index(ast.Name("x", ast.Load()))
+
+
+def test_node_table_from_flattened(backend):
+    tree = ast.parse(SOURCE)
+    inspector = Inspector(tree)
+    flattened = inspector.prepare(tree)
+    nodes = NodeTable.from_flattened(*flattened)
+    assert nodes.nodes is flattened[0]
+
+    # load contexts are in the pruned subtrees of names, so they are
+    # collected from a complete table
+    for node_types in (ast.Subscript, ast.Load, (ast.Call, ast.Load)):
+        assert list(nodes.find(tree, node_types)) == list(
+            walk(tree, node_types)
+        )
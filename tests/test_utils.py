@@ -13,7 +13,9 @@ from it.utils import (
     is_single_node,
     mark,
     name_check,
+    strtobool,
     target_check,
+    traverse_paths,
     tuple_check,
     version_bound_check,
 )
@@ -122,3 +124,73 @@ def test_version_bound_check():
     assert version_bound_check(1, 2, True)
     assert version_bound_check(ast.Constant(1), "Constant", False)
     assert not version_bound_check(ast.Constant(1), "Subscript", False)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    files = (
+        "a.py",
+        "b.txt",
+        "pkg/c.py",
+        "pkg/gen/d.py",
+        "pkg/gen/keep.py",
+        "pkg/e_pb2.py",
+        "pkg/.venv/f.py",
+        "node_modules/g.py",
+        "vendor/h.py",
+        "logs/i.py",
+    )
+    for file in files:
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_text("")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".gitignore").write_text("# comment\n/vendor/\nlogs\n")
+    (tmp_path / "pkg" / ".gitignore").write_text("gen/*\n!gen/keep.py\n")
+    return tmp_path
+
+
+def relative(files, root):
+    return [file.relative_to(root).as_posix() for file in files]
+
+
+def test_strtobool():
+    for value in ("y", "Yes", "t", "TRUE", "on", "1"):
+        assert strtobool(value) == 1
+    for value in ("n", "No", "f", "false", "OFF", "0"):
+        assert strtobool(value) == 0
+    with pytest.raises(ValueError):
+        strtobool("maybe")
+
+
+def test_traverse_paths(tree):
+    assert relative(traverse_paths([tree]), tree) == [
+        "a.py",
+        "pkg/c.py",
+        "pkg/e_pb2.py",
+        "pkg/gen/keep.py",
+    ]
+    assert relative(traverse_paths([tree], ["*_pb2.py", "gen"]), tree) == [
+        "a.py",
+        "pkg/c.py",
+    ]
+    assert relative(traverse_paths([tree], gitignore=False), tree) == [
+        "a.py",
+        "logs/i.py",
+        "pkg/c.py",
+        "pkg/e_pb2.py",
+        "pkg/gen/d.py",
+        "pkg/gen/keep.py",
+        "vendor/h.py",
+    ]
+
+
+def test_traverse_paths_nested(tree):
+    # rules from the parent directories still apply
+    assert relative(traverse_paths([tree / "pkg" / "gen"]), tree) == [
+        "pkg/gen/keep.py"
+    ]
+    assert list(traverse_paths([tree / "vendor" / "h.py"])) == [
+        tree / "vendor" / "h.py"
+    ]
+    with pytest.raises(FileNotFoundError):
+        traverse_paths([tree / "missing"])
@@ -0,0 +1,79 @@
+import shutil
+import subprocess
+
+import pytest
+
+from it import vcs
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("git") is None, reason="git is not available"
+)
+
+
+def git(repo, *args):
+    subprocess.run(("git", *args), cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    git(tmp_path, "init")
+    git(tmp_path, "config", "user.email", "it@example.com")
+    git(tmp_path, "config", "user.name", "it")
+    (tmp_path / "a.py").write_text("a = 1\nb = 2\nc = 3\n")
+    (tmp_path / "b.py").write_text("x = 1\n")
+    (tmp_path / "old.py").write_text("y = 1\nz = 2\n")
+    (tmp_path / "c.txt").write_text("x\n")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-m", "initial")
+
+    (tmp_path / "a.py").write_text("a = 1\nb = 4\nc = 3\nd = 5\n")
+    (tmp_path / "c.txt").write_text("y\n")
+    (tmp_path / "d.py").write_text("staged = 1\n")
+    git(tmp_path, "add", "d.py")
+    git(tmp_path, "mv", "old.py", "new.py")
+    (tmp_path / "e.py").write_text("untracked = 1\n")
+    return tmp_path.resolve()
+
+
+def test_changed_files(repo):
+    assert vcs.changed_files("HEAD", cwd=repo) == [
+        repo / "a.py",
+        repo / "d.py",
+        repo / "new.py",
+    ]
+    assert vcs.changed_files("HEAD", include_untracked=True, cwd=repo) == [
+        repo / "a.py",
+        repo / "d.py",
+        repo / "new.py",
+        repo / "e.py",
+    ]
+
+
+def test_changed_lines(repo, monkeypatch):
+    files = vcs.changed_files("HEAD", include_untracked=True, cwd=repo)
+    calls = []
+    git = vcs._git
+
+    def counting_git(*args, **kwargs):
+        calls.append(args[0])
+        return git(*args, **kwargs)
+
+    monkeypatch.setattr(vcs, "_git", counting_git)
+    ranges = vcs.changed_lines("HEAD", [*files, repo / "b.py"], cwd=repo)
+    assert ranges == {
+        repo / "a.py": [(2, 2), (4, 4)],
+        repo / "d.py": [(1, 1)],
+        repo / "new.py": [(1, 2)],
+        repo / "e.py": None,
+        repo / "b.py": [],
+    }
+    # a single diff for all files, no matter how many there are
+    assert calls == ["rev-parse", "diff", "ls-files"]
+    assert vcs.in_ranges(4, ranges[repo / "a.py"])
+    assert not vcs.in_ranges(3, ranges[repo / "a.py"])
+    assert vcs.in_ranges(3, ranges[repo / "e.py"])
+
+
+def test_not_a_repository(tmp_path):
+    with pytest.raises(vcs.GitError):
+        vcs.changed_files("HEAD", cwd=tmp_path)
@@ -0,0 +1,88 @@
+import pytest
+
+from it.config import Config
+from it.session import Session
+from it.watch import Inotify, Watcher
+
+
+@pytest.fixture
+def session():
+    session = Session(Config(serial=True, cache=False))
+    session.start()
+    yield session
+    session.shutdown()
+
+
+def test_watcher(tmp_path, session):
+    source = tmp_path / "a.py"
+    source.write_text("def foo(x=[]): pass\n")
+    watcher = Watcher(session, [tmp_path])
+
+    changed, removed = watcher.poll()
+    assert changed == [source]
+    assert removed == []
+    new, resolved = watcher.inspect(changed, removed)
+    assert new == [(source, ("general", "DEFAULT_MUTABLE_ARG", 1, 0))]
+    assert resolved == []
+
+    scans = []
+    watcher.scan = lambda scan=watcher.scan: scans.append(1) or scan()
+    assert watcher.poll() == ([], [])
+
+    source.write_text("def foo(x=None): pass\n")
+    assert watcher.poll() == ([source], [])
+    assert not scans
+    new, resolved = watcher.inspect([source], [])
+    assert new == []
+    assert resolved == [(source, ("general", "DEFAULT_MUTABLE_ARG", 1, 0))]
+    assert watcher.findings == {}
+
+    other = tmp_path / "b.py"
+    other.write_text("def bar(y={}): pass\n")
+    assert watcher.poll() == ([other], [])
+    assert len(scans) == 1
+    new, _ = watcher.inspect([other], [])
+    assert [file for file, _ in new] == [other]
+
+    other.unlink()
+    assert watcher.poll() == ([], [other])
+    assert len(scans) == 2
+    new, resolved = watcher.inspect([], [other])
+    assert new == []
+    assert [file for file, _ in resolved] == [other]
+    assert watcher.findings == {}
+
+
+def test_inotify(tmp_path):
+    inotify = Inotify.create()
+    if inotify is None:
+        pytest.skip("inotify isn't available")
+
+    try:
+        inotify.watch(tmp_path)
+        assert not inotify.wait(0)
+        (tmp_path / "a.py").write_text("pass\n")
+        assert inotify.wait(1)
+        assert not inotify.wait(0)
+    finally:
+        inotify.close()
+
+
+def test_inotify_watch_failure(tmp_path, session):
+    inotify = Inotify.create()
+    if inotify is None:
+        pytest.skip("inotify isn't available")
+
+    try:
+        inotify._add_watch = lambda *args: -1
+        assert not inotify.watch(tmp_path)
+
+        # changes of the unwatched directory are still found by polling
+        watcher = Watcher(session, [tmp_path], inotify)
+        assert watcher.poll() == ([], [])
+        source = tmp_path / "a.py"
+        source.write_text("pass\n")
+        assert not inotify.wait(0)
+        assert watcher.poll() == ([source], [])
+    finally:
+        inotify.close()